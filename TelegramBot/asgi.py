@@ -3,14 +3,23 @@ ASGI config for TelegramBot project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Telegram webhooks and keep-alive pings are answered by meabot's fast path
+without going through Django's middleware; all other requests are passed
+on to the regular Django ASGI application.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
 
 import os
 
+import django
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'TelegramBot.settings')
 
-application = get_asgi_application()
+django.setup(set_prefix=False)
+
+from meabot.fastpath import FastPathRouter  # noqa: E402  (needs the app registry)
+
+application = FastPathRouter(get_asgi_application)
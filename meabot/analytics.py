@@ -0,0 +1,87 @@
+# meabot/analytics.py
+
+import os
+import logging
+import threading
+from collections import Counter
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import ItemView
+from .tenants import get_current_source
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: order menus by view count instead of sheet order
+POPULAR_FIRST = os.environ.get('MEABOT_POPULAR_FIRST', '0') == '1'
+
+# (tenant, kind, key) -> views since the last flush. Recording is a dict
+# increment on the event loop, but flush() swaps the buffer from a worker
+# thread, so both take a lock (uncontended, never held across I/O).
+_buffer = Counter()
+_lock = threading.Lock()
+
+
+def record_view(kind, key):
+    key = (get_current_source().key, kind, key)
+    with _lock:
+        _buffer[key] += 1
+
+
+def flush():
+    """
+    Adds the buffered view counts to ItemView in one transaction, resets the
+    buffer and republishes the popularity snapshot. Increments are done in SQL
+    so concurrent workers never overwrite each other's counts.
+    """
+    global _buffer
+    with _lock:
+        pending, _buffer = _buffer, Counter()
+    try:
+        with transaction.atomic():
+            for (tenant, kind, key), count in pending.items():
+                updated = ItemView.objects.filter(tenant=tenant, kind=kind, key=key).update(count=F('count') + count)
+                if not updated:
+                    try:
+                        with transaction.atomic():
+                            ItemView.objects.create(tenant=tenant, kind=kind, key=key, count=count)
+                    except IntegrityError:
+                        # Another worker created the row in the meantime
+                        ItemView.objects.filter(tenant=tenant, kind=kind, key=key).update(count=F('count') + count)
+    except Exception as e:
+        logger.error("Failed to flush view counts, keeping them for the next flush: %s", e)
+        with _lock:
+            _buffer.update(pending)
+        return 0
+    if POPULAR_FIRST:
+        publish_popularity()
+    return len(pending)
+
+
+def publish_popularity():
+    """
+    Puts {item key: views} per tenant and kind into the cache. Menus read only
+    this snapshot, so building a menu never touches the database.
+    """
+    snapshot = {}
+    for tenant, kind, key, count in ItemView.objects.values_list('tenant', 'kind', 'key', 'count'):
+        snapshot.setdefault(f"{tenant}:popularity:{kind}", {})[key] = count
+    cache.set_many(snapshot, None)
+
+
+def get_popularity(kind):
+    """Returns {item key: views} for the current tenant from the last published snapshot."""
+    return cache.get(f"{get_current_source().key}:popularity:{kind}") or {}
+
+
+def rank(kind, items, key_func):
+    """
+    Returns (original_index, item) pairs, most viewed first when POPULAR_FIRST
+    is on; otherwise in sheet order. Original indices keep callback data stable.
+    """
+    indexed = list(enumerate(items))
+    if not POPULAR_FIRST:
+        return indexed
+    counts = get_popularity(kind)
+    return sorted(indexed, key=lambda pair: -counts.get(key_func(pair[1]), 0))
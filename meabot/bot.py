@@ -1,39 +1,183 @@
 # meabot/bot.py
 
+import asyncio
+import hashlib
 import logging
-from telegram.ext import ApplicationBuilder, CommandHandler, CallbackQueryHandler, MessageHandler, filters, PicklePersistence
+from collections import deque
+from telegram import Update
+from telegram.ext import Application, ApplicationBuilder, CommandHandler, CallbackQueryHandler, MessageHandler, TypeHandler, filters, PicklePersistence
 from .telegram_handlers import (
-    start_command, help_command, list_command, inline_button_handler, ask_command, message_handler, discounts_command
+    start_command, help_command, list_command, inline_button_handler, ask_command, message_handler, discounts_command,
+    bind_tenant, admin_reply_handler, error_handler
 )
+from .tenants import get_sources
+from .botapi import api_request, configure
 import os
 import telegram.ext
 
 TELEGRAM_BOT_TOKEN  = os.environ.get('TELEGRAM_BOT_TOKEN')
 
+# Extra bots served by this process, comma-separated. Tokens configured on
+# tenants (MEABOT_TENANTS) are picked up as well.
+TELEGRAM_BOT_TOKENS = [t.strip() for t in os.environ.get('TELEGRAM_BOT_TOKENS', '').split(',') if t.strip()]
+
+# Updates processed in parallel (0 = one at a time); messages of the same chat
+# are still handled in order, see ChatSerializedApplication.
+CONCURRENT_UPDATES = int(os.environ.get('MEABOT_CONCURRENT_UPDATES', 0))
+
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     level=logging.INFO
 )
+logger = logging.getLogger(__name__)
+
+# All extra bots send through one connection pool instead of one pool each.
+# Endpoint, pool sizes and timeouts are configured in meabot/botapi.py.
+shared_request = api_request(int(os.environ.get('MEABOT_SHARED_POOL_SIZE', 0)))
+
+
+class ChatSerializedApplication(Application):
+    """
+    Application that processes updates of different chats concurrently but
+    messages of one chat strictly one after another, so a user's /ask and the
+    text that follows never race. Updates arriving while their chat is busy
+    are queued and processed by the task already handling that chat, so they
+    do not hold a concurrent_updates slot while they wait. Button presses are
+    not serialized: inline_button_handler debounces and coalesces them per
+    message, which only works if they reach it while one is still running.
+    """
+
+    async def process_update(self, update):
+        chat = update.effective_chat if isinstance(update, Update) else None
+        if chat is None or update.callback_query is not None:
+            return await super().process_update(update)
+
+        queues = self.__dict__.setdefault('_chat_queues', {})
+        queue = queues.get(chat.id)
+        if queue is not None:
+            queue.append(update)
+            return
+        queue = queues[chat.id] = deque()
+        try:
+            while True:
+                try:
+                    await super().process_update(update)
+                except Exception:
+                    logger.exception("Failed to process update %s", update.update_id)
+                if not queue:
+                    break
+                update = queue.popleft()
+        finally:
+            del queues[chat.id]
+
+
+def token_hash(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def register_handlers(application):
+    # Pick the tenant (data source) before any other handler looks at sheet data
+    application.add_handler(TypeHandler(Update, bind_tenant), group=-1)
+
+    # Register all your handlers
+    application.add_handler(CommandHandler("start", start_command))
+    application.add_handler(CommandHandler("help", help_command))
+    application.add_handler(CommandHandler("list", list_command))
+    application.add_handler(CommandHandler("discounts", discounts_command))
+    application.add_handler(CallbackQueryHandler(inline_button_handler))
+
+    application.add_handler(CommandHandler("ask", ask_command))
+
+    # Admin chats: replies to posted questions are answers, not user questions
+    admin_chat_ids = [s.admin_chat_id for s in get_sources().values() if s.admin_chat_id]
+    if admin_chat_ids:
+        application.add_handler(
+            MessageHandler(filters.Chat(chat_id=admin_chat_ids) & ~filters.COMMAND, admin_reply_handler)
+        )
+
+    # Catch-all text messages that are not commands
+    application.add_handler(
+        MessageHandler(filters.TEXT & ~filters.COMMAND, message_handler)
+    )
+    # Out of Sheets reads with nothing cached: tell the user instead of going silent
+    application.add_error_handler(error_handler)
+
+
+def build_application(token):
+    """
+    Builds the Application of an extra (webhook-only) bot. It shares the
+    request pool with the other extra bots and has no Updater of its own;
+    Sheets client and data caches are module-level and shared already.
+    """
+    application = (
+        configure(ApplicationBuilder(), request=shared_request, get_updates=False)
+        .application_class(ChatSerializedApplication)
+        .token(token)
+        .concurrent_updates(CONCURRENT_UPDATES or False)
+        .updater(None)
+        .persistence(PicklePersistence(filepath=f'meabot_data_{token_hash(token)[:12]}.pickle'))
+        .build()
+    )
+    register_handlers(application)
+    return application
+
 
 application = (
-    ApplicationBuilder()
+    configure(ApplicationBuilder())
+    .application_class(ChatSerializedApplication)
     .token(TELEGRAM_BOT_TOKEN)
+    .concurrent_updates(CONCURRENT_UPDATES or False)
     .persistence(telegram.ext.PicklePersistence(filepath='meabot_data.pickle'))
     .build()
 )
+register_handlers(application)
+
+
+# --------------------------
+# Application registry: token hash -> Application, built on first use
+# --------------------------
+_known_tokens = {}
+_applications = {}
+_initialized = set()
+_init_lock = asyncio.Lock()
+
+
+def _load_tokens():
+    tokens = list(TELEGRAM_BOT_TOKENS)
+    tokens.extend(s.bot_token for s in get_sources().values() if s.bot_token)
+    for token in tokens:
+        _known_tokens.setdefault(token_hash(token), token)
+    if TELEGRAM_BOT_TOKEN:
+        key = token_hash(TELEGRAM_BOT_TOKEN)
+        _known_tokens[key] = TELEGRAM_BOT_TOKEN
+        _applications[key] = application
 
-# Register all your handlers
-application.add_handler(CommandHandler("start", start_command))
-application.add_handler(CommandHandler("help", help_command))
-application.add_handler(CommandHandler("list", list_command))
-application.add_handler(CommandHandler("discounts", discounts_command))
-application.add_handler(CallbackQueryHandler(inline_button_handler))
 
-application.add_handler(CommandHandler("ask", ask_command))
+async def get_application(token):
+    """
+    Returns the initialized Application for `token`, or None if this process
+    does not serve that bot.
+    """
+    if not _known_tokens:
+        _load_tokens()
+    key = token_hash(token or '')
+    if key not in _known_tokens:
+        return None
+    if key not in _initialized:
+        async with _init_lock:
+            if key not in _initialized:
+                app = _applications.get(key)
+                if app is None:
+                    app = _applications[key] = build_application(_known_tokens[key])
+                await app.initialize()
+                _initialized.add(key)
+    return _applications[key]
 
-application.add_handler(CallbackQueryHandler(inline_button_handler))
 
-# Catch-all text messages that are not commands
-application.add_handler(
-    MessageHandler(filters.TEXT & ~filters.COMMAND, message_handler)
-)
\ No newline at end of file
+async def application_for_source(source):
+    """The bot that answers users of a tenant: its own bot if it has one, else the default bot."""
+    if source.bot_token:
+        app = await get_application(source.bot_token)
+        if app is not None:
+            return app
+    return await get_application(TELEGRAM_BOT_TOKEN)
@@ -0,0 +1,89 @@
+# meabot/botapi.py
+
+import os
+import logging
+from telegram.request import HTTPXRequest
+
+logger = logging.getLogger(__name__)
+
+# --------------------------
+# Outbound Bot API settings
+# --------------------------
+# A self-hosted Bot API server (https://github.com/tdlib/telegram-bot-api) or
+# the fake_bot_api command can be used instead of api.telegram.org.
+BOT_API_BASE_URL = os.environ.get('TELEGRAM_API_BASE_URL', 'https://api.telegram.org/bot')
+BOT_API_BASE_FILE_URL = os.environ.get(
+    'TELEGRAM_API_BASE_FILE_URL',
+    BOT_API_BASE_URL[:-len('bot')] + 'file/bot' if BOT_API_BASE_URL.endswith('/bot') else BOT_API_BASE_URL,
+)
+
+# Connections for API calls (sendMessage, answerCallbackQuery, ...). Bursts of
+# answers and broadcasts wait for a free connection up to POOL_TIMEOUT.
+POOL_SIZE = int(os.environ.get('MEABOT_POOL_SIZE', 32))
+POOL_TIMEOUT = float(os.environ.get('MEABOT_POOL_TIMEOUT', 5))
+CONNECT_TIMEOUT = float(os.environ.get('MEABOT_CONNECT_TIMEOUT', 5))
+READ_TIMEOUT = float(os.environ.get('MEABOT_READ_TIMEOUT', 5))
+WRITE_TIMEOUT = float(os.environ.get('MEABOT_WRITE_TIMEOUT', 20))  # photo uploads
+
+# getUpdates (runbot only) has its own pool, so long polls never hold up replies.
+GET_UPDATES_POOL_SIZE = int(os.environ.get('MEABOT_GET_UPDATES_POOL_SIZE', 1))
+
+# Needs the optional h2 package (pip install "httpx[http2]").
+HTTP2 = os.environ.get('MEABOT_HTTP2', '0') == '1'
+
+
+class TunedHTTPXRequest(HTTPXRequest):
+    """
+    HTTPXRequest that can speak HTTP/2. python-telegram-bot 20.0 has no
+    switch for it, so the client is rebuilt with http2 enabled.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, *args, http2=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        if http2:
+            self._client_kwargs['http2'] = True
+            try:
+                self._client = self._build_client()
+            except ImportError:
+                logger.warning("MEABOT_HTTP2 is set but h2 is not installed; using HTTP/1.1")
+                del self._client_kwargs['http2']
+
+
+def api_request(pool_size=None):
+    return TunedHTTPXRequest(
+        connection_pool_size=pool_size or POOL_SIZE,
+        pool_timeout=POOL_TIMEOUT,
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+        write_timeout=WRITE_TIMEOUT,
+        http2=HTTP2,
+    )
+
+
+def get_updates_request():
+    # Long polling passes its own read timeout per call
+    return TunedHTTPXRequest(
+        connection_pool_size=GET_UPDATES_POOL_SIZE,
+        pool_timeout=POOL_TIMEOUT,
+        connect_timeout=CONNECT_TIMEOUT,
+        http2=HTTP2,
+    )
+
+
+def configure(builder, request=None, get_updates=True):
+    """
+    Applies the endpoint and pool settings to an ApplicationBuilder. Pass
+    `request` to share one pool between several bots; bots without an
+    Updater (webhook-only) must pass get_updates=False.
+    """
+    builder = (
+        builder
+        .base_url(BOT_API_BASE_URL)
+        .base_file_url(BOT_API_BASE_FILE_URL)
+        .request(request or api_request())
+    )
+    if get_updates:
+        builder = builder.get_updates_request(get_updates_request())
+    return builder
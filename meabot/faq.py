@@ -0,0 +1,242 @@
+# meabot/faq.py
+
+import os
+import re
+import math
+import time
+import logging
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from django.db.models import Q
+
+from .models import Question
+from .google_sheets import fetch_exchange_opportunities, fetch_internships, fetch_student_discounts
+
+logger = logging.getLogger(__name__)
+
+# Set MEABOT_FAQ=0 to always hand questions to the team.
+FAQ_ENABLED = os.environ.get("MEABOT_FAQ", "1") != "0"
+# Share of the question's (idf-weighted) words the best match must contain
+MIN_CONFIDENCE = float(os.environ.get("MEABOT_FAQ_MIN_CONFIDENCE", 0.6))
+# The runner-up (with a different answer) must score clearly lower
+MIN_MARGIN = 1.15
+# How often the scheduler checks each index for newly answered questions and
+# sheet changes
+REFRESH_SECONDS = float(os.environ.get("MEABOT_FAQ_REFRESH", 30))
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+_TOKEN = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a about am an and any are as at be by can could do does for from get has have hello hi how "
+    "i if in info information is it know me my need not of on or our please should so tell "
+    "thank thanks that the there this to want was we what when where which who why will "
+    "with would you your".split()
+)
+
+
+def tokenize(text):
+    return [t for t in _TOKEN.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+@dataclass(frozen=True, slots=True)
+class FaqEntry:
+    question: str   # past question, or the title of a sheet item
+    answer: str
+    kind: str       # "question", "exchanges", "internships" or "discounts"
+
+
+@dataclass(frozen=True, slots=True)
+class Match:
+    entry: FaqEntry
+    score: float
+    confidence: float
+
+
+class BM25Index:
+    """
+    Okapi BM25 over short documents. Documents are only ever appended, so
+    postings and length totals are updated in place; idf is computed from
+    the posting list length at query time.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.lengths = []
+        self.total_length = 0
+        self.postings = defaultdict(list)  # term -> [(doc id, term frequency)]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, text, entry):
+        tokens = tokenize(text)
+        if not tokens:
+            return
+        doc_id = len(self.entries)
+        self.entries.append(entry)
+        self.lengths.append(len(tokens))
+        self.total_length += len(tokens)
+        counts = defaultdict(int)
+        for token in tokens:
+            counts[token] += 1
+        for token, tf in counts.items():
+            self.postings[token].append((doc_id, tf))
+
+    def _idf(self, term):
+        n = len(self.entries)
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, text, limit=3):
+        terms = set(tokenize(text))
+        if not terms or not self.entries:
+            return []
+        avg_length = self.total_length / len(self.entries)
+        scores = defaultdict(float)
+        matched_weight = defaultdict(float)
+        idfs = {term: self._idf(term) for term in terms}
+        for term in terms:
+            idf = idfs[term]
+            for doc_id, tf in self.postings.get(term, ()):
+                norm = tf + K1 * (1 - B + B * self.lengths[doc_id] / avg_length)
+                scores[doc_id] += idf * tf * (K1 + 1) / norm
+                matched_weight[doc_id] += idf
+        total_weight = sum(idfs.values())
+        best = sorted(scores, key=scores.get, reverse=True)[:limit]
+        return [Match(self.entries[d], scores[d], matched_weight[d] / total_weight) for d in best]
+
+
+# --------------------------
+# Per-tenant indexes
+# --------------------------
+def _sheet_entries(source):
+    """(indexed text, entry) pairs for the items listed in the tenant's sheet."""
+    for e in fetch_exchange_opportunities(source=source):
+        answer = (
+            f"🌍 {e.program_name} ({e.partner_university})\n"
+            f"Who can apply: {e.who_can_apply}\n"
+            f"Registration: {e.start_reg} – {e.end_reg}\n"
+            f"Duration: {e.duration}\n"
+            f"Website: {e.website}"
+        )
+        text = f"{e.program_name} {e.partner_university} {e.who_can_apply}"
+        yield text, FaqEntry(e.program_name, answer, "exchanges")
+    for i in fetch_internships(source=source):
+        answer = (
+            f"💼 {i.internship_program}\n"
+            f"Field: {i.field_department}\n"
+            f"Location: {i.location}\n"
+            f"Deadline: {i.application_deadline}\n"
+            f"Apply: {i.application_link}"
+        )
+        text = f"{i.internship_program} {i.field_department} {i.location}"
+        yield text, FaqEntry(i.internship_program, answer, "internships")
+    for d in fetch_student_discounts(source=source):
+        answer = f"🏢 {d.organization}: {d.discount}\n" + "\n".join(f"➖ {a}" for a in d.addresses)
+        text = f"{d.organization} {d.category} {d.details}"
+        yield text, FaqEntry(d.organization, answer, "discounts")
+
+
+class TenantFaq:
+    """
+    The index of one tenant. Answered questions are added incrementally
+    (new ids, or answers sent since the last check); a change in the sheet
+    data triggers a full rebuild, which is cheap at sheet sizes.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.index = BM25Index()
+        self.last_id = 0
+        self.last_sent_at = None
+        self.seen_ids = set()
+        self.sheet_fingerprint = None
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        """Brings the index up to date; run by the scheduler, never per question."""
+        with self.lock:
+            sheet = list(_sheet_entries(self.source))
+            fingerprint = hash(tuple(entry for _, entry in sheet))
+            if fingerprint != self.sheet_fingerprint:
+                self._rebuild(sheet, fingerprint)
+            else:
+                self._add_answered()
+
+    def _rebuild(self, sheet, fingerprint):
+        # Built aside and swapped in at once: best_match runs on the event loop
+        # meanwhile and must never search a half-filled index
+        started = time.perf_counter()
+        index = BM25Index()
+        self.last_id, self.last_sent_at, self.seen_ids = 0, None, set()
+        for text, entry in sheet:
+            index.add(text, entry)
+        self._add_answered(index)
+        self.index = index
+        self.sheet_fingerprint = fingerprint
+        logger.info("FAQ index for %s rebuilt: %d entries in %.0f ms",
+                    self.source.key, len(index), (time.perf_counter() - started) * 1000)
+
+    def _add_answered(self, index=None):
+        # Adding to the live index is safe: add() records a document before
+        # any posting points at it
+        if index is None:
+            index = self.index
+        answered = Question.objects.filter(tenant=self.source.key, status=Question.SENT).exclude(answer="")
+        if self.last_id:
+            since = Q(id__gt=self.last_id)
+            if self.last_sent_at:
+                since |= Q(sent_at__gt=self.last_sent_at)
+            answered = answered.filter(since)
+        for q in answered.only("id", "question", "answer", "sent_at").order_by("id"):
+            if q.id in self.seen_ids:
+                continue
+            self.seen_ids.add(q.id)
+            index.add(q.question, FaqEntry(q.question, q.answer, "question"))
+            self.last_id = max(self.last_id, q.id)
+            if q.sent_at and (self.last_sent_at is None or q.sent_at > self.last_sent_at):
+                self.last_sent_at = q.sent_at
+
+    def best_match(self, text):
+        matches = self.index.search(text)
+        if not matches or len(tokenize(text)) < 2:
+            return None
+        top = matches[0]
+        if top.confidence < MIN_CONFIDENCE:
+            return None
+        for other in matches[1:]:
+            # Two different answers scoring about the same: not sure enough
+            if other.entry.answer != top.entry.answer and other.score * MIN_MARGIN > top.score:
+                return None
+        return top
+
+
+_faqs = {}
+
+
+def get_faq(source):
+    faq = _faqs.get(source.key)
+    if faq is None:
+        faq = _faqs[source.key] = TenantFaq(source)
+    return faq
+
+
+async def suggest_answer(source, text):
+    """
+    Returns the Match that answers `text` confidently enough to reply
+    without staff, or None. Searching is in-memory only; the index is
+    built and refreshed by the scheduler (see refresh_faq), so until its
+    first run every question goes to the team.
+    """
+    if not FAQ_ENABLED:
+        return None
+    return get_faq(source).best_match(text)
+
+
+def refresh_faq(source):
+    """Scheduler job body: updates the tenant's index from the DB and sheet caches."""
+    get_faq(source).refresh()
@@ -0,0 +1,132 @@
+# meabot/fastpath.py
+
+import asyncio
+import logging
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signals
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # optional speed-up, the stdlib parser accepts bytes too
+    import json
+    _loads = json.loads
+
+from .views import check_webhook_secret, dispatch_update
+from . import analytics, metrics, scheduler
+
+logger = logging.getLogger(__name__)
+
+# Must match the URLs the project mounts meabot under (TelegramBot/urls.py)
+WEBHOOK_PREFIX = "/meabot/webhook/"
+KEEP_ALIVE_PATH = "/meabot/keep_alive/"
+SECRET_HEADER = b"x-telegram-bot-api-secret-token"
+
+
+async def _respond(send, status, body=b"OK"):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"text/plain; charset=utf-8"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _read_body(receive, limit):
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if limit is not None and size > limit:
+            return None
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+def _header(scope, name):
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class FastPathRouter:
+    """
+    ASGI app in front of Django. Webhook POSTs and keep-alive pings are
+    served here without middleware, URL resolving or the sync bridge;
+    every other request goes to the Django ASGI handler, which is only
+    built when the first such request arrives.
+    """
+
+    def __init__(self, django_app_factory):
+        self._django_app_factory = django_app_factory
+        self._django_app = None
+
+    @property
+    def django_app(self):
+        if self._django_app is None:
+            self._django_app = self._django_app_factory()
+        return self._django_app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] == "http":
+            path, method = scope["path"], scope["method"]
+            if method == "POST" and path.startswith(WEBHOOK_PREFIX) and path.endswith("/"):
+                return await self._webhook(scope, receive, send, path[len(WEBHOOK_PREFIX):-1])
+            if path == KEEP_ALIVE_PATH and method in ("GET", "HEAD"):
+                return await _respond(send, 200)
+        return await self.django_app(scope, receive, send)
+
+    async def _webhook(self, scope, receive, send, bot_token):
+        if not bot_token:
+            return await _respond(send, 404, b"Not Found")
+        if not check_webhook_secret(_header(scope, SECRET_HEADER)):
+            return await _respond(send, 403, b"Forbidden")
+
+        body = await _read_body(receive, settings.DATA_UPLOAD_MAX_MEMORY_SIZE)
+        if body is None:
+            return await _respond(send, 413, b"Request Entity Too Large")
+        try:
+            data = _loads(body)
+        except ValueError:
+            return await _respond(send, 400, b"Bad Request")
+
+        try:
+            await dispatch_update(bot_token, data)
+        except Exception:
+            logger.exception("Failed to process webhook update")
+            return await _respond(send, 500, b"Internal Server Error")
+        await _respond(send, 200)
+        # Same cleanup Django runs after a request (stale DB connections,
+        # cache connections), done once the reply is already on its way.
+        await signals.request_finished.asend(sender=self.__class__)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                # Background jobs run from startup, not from the first update
+                try:
+                    scheduler.start()
+                except Exception:
+                    logger.exception("Scheduler failed to start")
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                try:
+                    await scheduler.stop()
+                    await sync_to_async(analytics.flush)()
+                    await asyncio.to_thread(metrics.flush)
+                except Exception:
+                    logger.exception("Shutdown flush failed")
+                await send({"type": "lifespan.shutdown.complete"})
+                return
@@ -2,7 +2,6 @@
 
 import os
 import logging
-import datetime
 import certifi
 import socket
 import re
@@ -13,18 +12,23 @@ import json
 from urllib3.util.ssl_ import create_urllib3_context
 from google.auth.transport.requests import Request
 import httplib2
+from .records import Exchange, Internship, Discount, FORMAT_VERSION, pack, unpack
+from . import metrics
+from .tenants import QuotaExceeded, get_current_source, get_sources
+from .schema import SCHEMAS, header_index, parse_rows
 
 logger = logging.getLogger(__name__)
 
 SHEETS_CACHE_TTL = 900
+# A failed read is cached as "no data" this long, so a broken sheet is not
+# re-read on every tap
+SHEETS_FAILURE_TTL = 60
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
 
+# Spreadsheet of the "default" tenant. Ranges and column order of every tenant
+# (including this one) come from its DataSource in meabot/tenants.py.
+# Discounts columns: A = Organization, B = Addresses, C = Discount, D = Details, E = Instagram, F = Category
 SPREADSHEET_ID = "16cHaJQiUydZtf4SCoy_g7menpb_U7Fu2qDuTLo8GH9M"
-EXCHANGE_RANGE_NAME = "Exchanges!A2:G"
-INTERNSHIPS_RANGE_NAME = "Internships!A2:F"
-
-# Discounts sheet range: A = Organization, B = Addresses, C = Discount, D = Details, E = Instagram, F = Category
-DISCOUNTS_RANGE_NAME = "Discounts!A2:F"
 
 # Build service once at startup
 service = None
@@ -60,207 +64,290 @@ def get_sheets_service():
             raise
     return service
 
-def fetch_exchange_opportunities():
-    cached = cache.get('exchange_opportunities_data')
-    if cached:
-        return cached
-        
+def _get_cached_records(key, cls):
+    packed = cache.get(f"{key}:v{FORMAT_VERSION}")
+    if packed is not None:
+        return unpack(cls, packed)
+    return None
+
+def _set_cached_records(key, records, timeout=SHEETS_CACHE_TTL):
+    cache.set(f"{key}:v{FORMAT_VERSION}", pack(records), timeout)
+
+def _store_snapshot(key, records, timeout):
+    # The ':last' copy never expires: it is served when the tenant is out of
+    # Sheets reads, so a throttled tenant sees slightly old data, not nothing
+    _set_cached_records(key, records, timeout)
+    _set_cached_records(f"{key}:last", records, None)
+
+def _last_snapshot(key, cls, error):
+    records = _get_cached_records(f"{key}:last", cls)
+    if records is not None:
+        logger.warning("%s; serving the last snapshot of %s", error, key)
+    return records
+
+def _read_tab(source, kind):
+    """
+    Reads one tab of `source` (header row included) and parses it with the
+    declarative schema for `kind`. Rejected rows are logged and dropped.
+    """
+    source.consume_read_quota()
+    metrics.incr('sheet_fetches')
     service = get_sheets_service()
     sheet = service.spreadsheets()
     response = sheet.values().get(
-        spreadsheetId=SPREADSHEET_ID,
-        range=EXCHANGE_RANGE_NAME
+        spreadsheetId=source.spreadsheet_id,
+        range=source.range_for(kind)
     ).execute()
 
-    values = response.get('values', [])
-    data = []
-    for row in values:
-        if len(row) < 7:
-            continue
-        data.append({
-            'program_name': row[0],
-            'partner_university': row[1],
-            'who_can_apply': row[2],
-            'start_reg': row[3],
-            'end_reg': row[4],
-            'duration': row[5],
-            'website': row[6],
-        })
-    
-    cache.set('exchange_opportunities_data', data, SHEETS_CACHE_TTL)
+    result = parse_rows(
+        SCHEMAS[kind],
+        response.get('values', []),
+        order=source.columns.get(kind),
+        headers=source.headers.get(kind),
+    )
+    if result.rejected:
+        logger.warning(
+            "%s/%s: rejected %d row(s), first: %s",
+            source.key, kind, len(result.rejected), result.rejected[:5]
+        )
+    return result.records
+
+def fetch_exchange_opportunities(force=False, source=None):
+    source = source or get_current_source()
+    cache_key = source.cache_key('exchange_opportunities_data')
+    cached = None if force else _get_cached_records(cache_key, Exchange)
+    if cached is not None:
+        return cached
+
+    try:
+        data = _read_tab(source, 'exchanges')
+    except QuotaExceeded as e:
+        stale = _last_snapshot(cache_key, Exchange, e)
+        if stale is None:
+            raise
+        return stale
+    _store_snapshot(cache_key, data, source.cache_ttl)
     return data
 
-def fetch_internships():
-    cached = cache.get('internships_data')
-    if cached:
+def fetch_internships(force=False, source=None):
+    source = source or get_current_source()
+    cache_key = source.cache_key('internships_data')
+    cached = None if force else _get_cached_records(cache_key, Internship)
+    if cached is not None:
         return cached
-        
-    service = get_sheets_service()
-    sheet = service.spreadsheets()
-    response = sheet.values().get(
-        spreadsheetId=SPREADSHEET_ID,
-        range=INTERNSHIPS_RANGE_NAME
-    ).execute()
 
-    values = response.get('values', [])
-    data = []
-    for row in values:
-        if len(row) < 6:  # Ensure all 6 columns exist
-            continue
-        data.append({
-            'internship_program': row[0],
-            'field_department': row[1],
-            'duration_details': row[2],
-            'location': row[3],
-            'application_deadline': row[4],
-            'application_link': row[5],
-        })
-    
-    cache.set('internships_data', data, SHEETS_CACHE_TTL)
+    try:
+        data = _read_tab(source, 'internships')
+    except QuotaExceeded as e:
+        stale = _last_snapshot(cache_key, Internship, e)
+        if stale is None:
+            raise
+        return stale
+    _store_snapshot(cache_key, data, source.cache_ttl)
     return data
 
-# NEW function to record a question
-def record_user_question(user_id, username, question_text):
+# ---------------------------
+# Questions tab (mirror of the local Question table, see meabot/questions.py)
+# ---------------------------
+# Timestamp, UserID, Username, Question, Answer, Sent, ID (the local Question.id)
+QUESTION_COLUMNS = 7
+
+
+def append_question_rows(rows, source=None):
     """
-    Appends a row to the 'Questions' tab with columns:
-    Timestamp, UserID, Username, Question
+    Appends rows of [Timestamp, UserID, Username, Question, Answer, Sent, ID]
+    to the tenant's 'Questions' tab in a single call. Returns the sheet row number of the
+    first appended row.
     """
+    source = source or get_current_source()
     service = get_sheets_service()
     sheet = service.spreadsheets()
 
-    timestamp = datetime.datetime.now().isoformat()
-    new_row = [[timestamp, user_id, username, question_text]]
-
-    sheet.values().append(
-        spreadsheetId=SPREADSHEET_ID,
-        range="Questions!A2:F",
+    response = sheet.values().append(
+        spreadsheetId=source.spreadsheet_id,
+        range=source.range_for('questions'),
         valueInputOption="USER_ENTERED",
-        body={"values": new_row}
+        body={"values": rows}
     ).execute()
+    # e.g. "Questions!A7:D9" -> 7
+    updated_range = response.get('updates', {}).get('updatedRange', '')
+    return int(re.search(r'![A-Z]+(\d+)', updated_range).group(1))
 
-# NEW: Function to check for answers and send them via Telegram
-def check_and_send_pending_answers(application):
+def read_question_rows(source=None, row_numbers=None):
     """
-    Checks the 'Questions' sheet for rows where an answer has been provided
-    (i.e. column E is nonempty) and the 'Sent' column (F) is not "yes".
-    For each such row, the bot sends the answer to the user (using the UserID in column B)
-    and then updates the row to mark the answer as sent.
+    Reads the 'Questions' tab, or only the given sheet rows (one batchGet).
+    Returns (row_number, row) pairs with rows padded to
+    Timestamp, UserID, Username, Question, Answer, Sent, ID.
     """
+    source = source or get_current_source()
+    source.consume_read_quota()
+    metrics.incr('sheet_fetches')
     service = get_sheets_service()
     sheet = service.spreadsheets()
 
+    if row_numbers is not None:
+        row_numbers = sorted(set(row_numbers))
+        if not row_numbers:
+            return []
+        tab = source.tabs['questions']
+        result = sheet.values().batchGet(
+            spreadsheetId=source.spreadsheet_id,
+            ranges=[f"{tab}!A{n}:G{n}" for n in row_numbers]
+        ).execute()
+        rows = [(vr.get('values') or [[]])[0] for vr in result.get('valueRanges', [])]
+        return [(n, row + [""] * (QUESTION_COLUMNS - len(row))) for n, row in zip(row_numbers, rows)]
+
     result = sheet.values().get(
-        spreadsheetId=SPREADSHEET_ID,
-        range="Questions!A2:F"
+        spreadsheetId=source.spreadsheet_id,
+        range=source.range_for('questions')
     ).execute()
 
-    rows = result.get('values', [])
-    if not rows:
-        print("No question rows found.")
+    # Note that the sheet rows start at row 2.
+    return [
+        (i + 2, row + [""] * (QUESTION_COLUMNS - len(row)))
+        for i, row in enumerate(result.get('values', []))
+    ]
+
+def write_question_answers(updates, source=None):
+    """
+    Writes Answer and Sent (columns E:F) of many rows in one batch call.
+    `updates` are (row_number, answer, sent) triples; with answer None only
+    Sent (F) is written. Answers may come from the admin chat, so they are
+    written RAW and never parsed as formulas.
+    """
+    if not updates:
         return
+    source = source or get_current_source()
+    service = get_sheets_service()
+    sheet = service.spreadsheets()
+    tab = source.tabs['questions']
+    sheet.values().batchUpdate(
+        spreadsheetId=source.spreadsheet_id,
+        body={
+            "valueInputOption": "RAW",
+            "data": [
+                {"range": f"{tab}!E{n}:F{n}", "values": [[answer, "yes" if sent else ""]]}
+                if answer is not None else
+                {"range": f"{tab}!F{n}", "values": [["yes" if sent else ""]]}
+                for n, answer, sent in updates
+            ],
+        }
+    ).execute()
 
-    # Import async_to_sync to call our asynchronous bot method in this synchronous context.
+def write_question_ids(updates, source=None):
+    """
+    Writes the local question id (column G) of many rows in one batch call,
+    for rows added by hand or mirrored before the column existed. `updates`
+    are (row_number, question_id) pairs.
+    """
+    if not updates:
+        return
+    source = source or get_current_source()
+    service = get_sheets_service()
+    sheet = service.spreadsheets()
+    tab = source.tabs['questions']
+    sheet.values().batchUpdate(
+        spreadsheetId=source.spreadsheet_id,
+        body={
+            "valueInputOption": "RAW",
+            "data": [
+                {"range": f"{tab}!G{n}", "values": [[question_id]]}
+                for n, question_id in updates
+            ],
+        }
+    ).execute()
+
+def check_and_send_pending_answers(application):
+    """
+    Synchronous entry point for views and management commands: syncs every
+    tenant's Questions tab with the local table and delivers new answers.
+    Tenants with a bot of their own are answered through that bot.
+    """
     from asgiref.sync import async_to_sync
+    from .bot import application_for_source
+    from .questions import reconcile_questions
 
-    # Process each row; note that the sheet rows start at row 2.
-    for i, row in enumerate(rows):
-        # Ensure the row has 6 columns (fill missing ones with empty strings)
-        row_extended = row + [""] * (6 - len(row))
-        timestamp, user_id, username, question_text, answer_text, sent = row_extended
-
-        # If an answer exists and it has not been sent yet...
-        if answer_text.strip() and sent.strip().lower() != "yes":
-            message_text = (
-                "✅ *Answer Received*\n\n"
-                f"*Your question:* {question_text}\n\n"
-                f"*Our answer:* {answer_text}"
-            )
-            try:
-                chat_id = int(user_id)
-            except Exception as e:
-                print(f"Error converting user_id {user_id} to int: {e}")
-                continue
-
-            # Send the answer to the user via Telegram.
-            async_to_sync(application.bot.send_message)(
-                chat_id=chat_id, text=message_text, parse_mode="Markdown"
-            )
-            print(f"Sent answer to user {chat_id}.")
-
-            # Now update the sheet to mark this answer as sent.
-            # The actual row number in the sheet is (i + 2)
-            row_number = i + 2
-            update_range = f"Questions!F{row_number}"
-            body = {"values": [["yes"]]}
-            sheet.values().update(
-                spreadsheetId=SPREADSHEET_ID,
-                range=update_range,
-                valueInputOption="USER_ENTERED",
-                body=body
-            ).execute()
+    async def dispatch(source):
+        bot_app = application if not source.bot_token else await application_for_source(source)
+        await reconcile_questions(bot_app, source)
 
-# ---------------------------
-# NEW: Fetch student discounts from sheet
-# ---------------------------
-def _split_addresses(addresses_raw: str):
+    for source in get_sources().values():
+        async_to_sync(dispatch)(source)
+
+def append_tab_rows(kind, rows, source=None):
     """
-    Split addresses cell into list. Accepts newline, ||, |, ; as separators.
+    Appends rows (dicts of field -> cell value) to a data tab in one call,
+    placing each value under the column whose header matches the field, so it
+    works whatever the tab's column order. Values are written as-is (RAW) so
+    "10%" stays text. Returns the number of rows written.
     """
-    if not addresses_raw:
-        return []
-    # Normalize line breaks
-    parts = re.split(r'\s*\n\s*|\s*\|\|\s*|\s*\|\s*|\s*;\s*', addresses_raw.strip())
-    result = [p.strip() for p in parts if p and p.strip()]
-    return result
+    if not rows:
+        return 0
+    source = source or get_current_source()
+    service = get_sheets_service()
+    sheet = service.spreadsheets()
+    tab = source.tabs[kind]
+    header = sheet.values().get(
+        spreadsheetId=source.spreadsheet_id,
+        range=f"{tab}!1:1"
+    ).execute().get('values', [[]])[0]
+
+    index = header_index(SCHEMAS[kind], header, source.headers.get(kind, {}))
+    if index is None:
+        index = {f: i for i, f in enumerate(source.columns[kind])}
+    width = max(index.values()) + 1
+    values = []
+    for row in rows:
+        cells = [""] * width
+        for field_name, value in row.items():
+            if field_name in index:
+                cells[index[field_name]] = value
+        values.append(cells)
 
-def fetch_student_discounts():
+    sheet.values().append(
+        spreadsheetId=source.spreadsheet_id,
+        range=f"{tab}!A1",
+        valueInputOption="RAW",
+        insertDataOption="INSERT_ROWS",
+        body={"values": values}
+    ).execute()
+    return len(values)
+
+def refresh_sheet_caches(source=None):
     """
-    Reads Discounts!A2:F and returns a list of dicts:
-    {
-      'organization': ...,
-      'addresses': [...],
-      'discount': ...,
-      'details': ...,
-      'instagram': ...,
-      'category': ...
-    }
-    The function caches result under 'student_discounts'.
+    Re-reads every data tab and overwrites the cached copies, so users keep
+    hitting a warm cache instead of waiting on a Sheets call after TTL expiry.
     """
-    cached = cache.get('student_discounts')
-    if cached:
+    fetch_student_discounts(force=True, source=source)
+    fetch_exchange_opportunities(force=True, source=source)
+    fetch_internships(force=True, source=source)
+
+# ---------------------------
+# NEW: Fetch student discounts from sheet
+# ---------------------------
+def fetch_student_discounts(force=False, source=None):
+    """
+    Reads the tenant's Discounts tab and returns a list of Discount records
+    (organization, addresses, discount, details, instagram, category).
+    The function caches result under '<tenant>:student_discounts'; pass force=True
+    to bypass the cache and re-read the sheet.
+    """
+    source = source or get_current_source()
+    cache_key = source.cache_key('student_discounts')
+    cached = None if force else _get_cached_records(cache_key, Discount)
+    if cached is not None:
         return cached
 
-    service = get_sheets_service()
-    sheet = service.spreadsheets()
-    # We fetch up to column F (6 columns) - adjust range if you add more columns
     try:
-        response = sheet.values().get(
-            spreadsheetId=SPREADSHEET_ID,
-            range=DISCOUNTS_RANGE_NAME
-        ).execute()
+        data = _read_tab(source, 'discounts')
     except Exception as e:
+        stale = _last_snapshot(cache_key, Discount, e) if isinstance(e, QuotaExceeded) else None
+        if stale is not None:
+            return stale
         logger.error("Failed to fetch Discounts sheet: %s", e, exc_info=True)
+        # ensure cache is set even when fetch failed (so we don't hammer sheet)
+        _set_cached_records(cache_key, [], SHEETS_FAILURE_TTL)
         return []
 
-    values = response.get('values', [])
-    data = []
-    for row in values:
-        # Ensure row has 6 columns
-        row_extended = row + [""] * (6 - len(row))
-        org, addresses_raw, discount, details, instagram, category = row_extended
-        if not org or not str(org).strip():
-            # skip empty organization rows
-            continue
-
-        addresses = _split_addresses(addresses_raw)
-        data.append({
-            'organization': str(org).strip(),
-            'addresses': addresses,
-            'discount': str(discount).strip(),
-            'details': str(details).strip(),
-            'instagram': str(instagram).strip(),
-            'category': str(category).strip()
-        })
-
-    cache.set('student_discounts', data, SHEETS_CACHE_TTL)
+    _store_snapshot(cache_key, data, source.cache_ttl)
     return data
@@ -0,0 +1,62 @@
+import time
+import asyncio
+from django.core.management.base import BaseCommand
+
+class Command(BaseCommand):
+    help = 'Measure outbound sendMessage throughput with the configured Bot API endpoint and pool settings.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=64, help='Calls in flight at once')
+        parser.add_argument('--chat-id', type=int, default=1)
+        parser.add_argument('--token', default='1:benchmark',
+                            help='Bot token (any value works against fake_bot_api)')
+        parser.add_argument('--pool-size', type=int, default=None, help='Override MEABOT_POOL_SIZE')
+
+    def handle(self, *args, **options):
+        from telegram import Bot
+        from meabot import botapi
+
+        self.stdout.write(
+            f"Endpoint {botapi.BOT_API_BASE_URL}, pool {options['pool_size'] or botapi.POOL_SIZE}, "
+            f"http2 {botapi.HTTP2}"
+        )
+
+        async def run():
+            bot = Bot(
+                options['token'],
+                base_url=botapi.BOT_API_BASE_URL,
+                base_file_url=botapi.BOT_API_BASE_FILE_URL,
+                request=botapi.api_request(options['pool_size']),
+            )
+            semaphore = asyncio.Semaphore(options['concurrency'])
+            latencies, errors = [], 0
+
+            async def send(i):
+                nonlocal errors
+                async with semaphore:
+                    started = time.perf_counter()
+                    try:
+                        await bot.send_message(options['chat_id'], f"benchmark {i}")
+                    except Exception:
+                        errors += 1
+                        return
+                    latencies.append(time.perf_counter() - started)
+
+            async with bot:
+                started = time.perf_counter()
+                await asyncio.gather(*(send(i) for i in range(options['messages'])))
+                elapsed = time.perf_counter() - started
+            return latencies, errors, elapsed
+
+        latencies, errors, elapsed = asyncio.run(run())
+        latencies.sort()
+        if latencies:
+            p50 = latencies[len(latencies) // 2] * 1000
+            p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+            self.stdout.write(self.style.SUCCESS(
+                f"{len(latencies)} sent, {errors} failed in {elapsed:.2f}s: "
+                f"{len(latencies) / elapsed:.0f} msg/s, p50 {p50:.1f} ms, p95 {p95:.1f} ms"
+            ))
+        else:
+            self.stdout.write(self.style.ERROR(f"All {errors} calls failed"))
@@ -0,0 +1,117 @@
+import json
+import time
+import asyncio
+import itertools
+from urllib.parse import parse_qs
+from django.core.management.base import BaseCommand
+
+# Methods answered with a Message object; everything else gets `true`.
+MESSAGE_METHODS = {
+    'sendMessage', 'sendPhoto', 'sendDocument', 'editMessageText', 'editMessageCaption',
+    'editMessageReplyMarkup', 'forwardMessage', 'copyMessage',
+}
+
+
+class FakeBotApi:
+    """
+    Minimal Bot API server: accepts any token, answers every method with a
+    plausible result after `latency` seconds, and counts the calls. Talks
+    HTTP/1.1 with keep-alive, like api.telegram.org.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = {}
+        self.message_ids = itertools.count(1)
+
+    def result_for(self, token, method, params):
+        if method == 'getMe':
+            return {'id': int(token.split(':')[0] or 0), 'is_bot': True,
+                    'first_name': 'Fake MEA bot', 'username': 'fake_mea_bot'}
+        if method == 'getUpdates':
+            return []
+        if method == 'getWebhookInfo':
+            return {'url': '', 'has_custom_certificate': False, 'pending_update_count': 0}
+        if method in MESSAGE_METHODS:
+            chat_id = params.get('chat_id', 0)
+            message = {
+                'message_id': params.get('message_id') or next(self.message_ids),
+                'date': int(time.time()),
+                'chat': {'id': int(chat_id) if str(chat_id).lstrip('-').isdigit() else 0, 'type': 'private'},
+            }
+            if 'text' in params:
+                message['text'] = params['text']
+            return message
+        return True
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                _, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0) or 0))
+
+                # /bot<token>/<method>
+                token, _, method = path.lstrip('/')[3:].partition('/')
+                method = method.split('?')[0]
+                params = {}
+                if headers.get('content-type', '').startswith('application/x-www-form-urlencoded'):
+                    params = {k: v[0] for k, v in parse_qs(body.decode()).items()}
+                elif headers.get('content-type', '').startswith('application/json') and body:
+                    params = json.loads(body)
+                self.calls[method] = self.calls.get(method, 0) + 1
+
+                if method == 'getUpdates':
+                    # Behave like an idle long poll, but never for long
+                    await asyncio.sleep(min(float(params.get('timeout', 0) or 0), 1.0))
+                elif self.latency:
+                    await asyncio.sleep(self.latency)
+
+                payload = json.dumps({'ok': True, 'result': self.result_for(token, method, params)}).encode()
+                writer.write(
+                    b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                    b'Content-Length: ' + str(len(payload)).encode() + b'\r\n\r\n' + payload
+                )
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+class Command(BaseCommand):
+    help = 'Run a local fake Telegram Bot API server for load and latency testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8081)
+        parser.add_argument('--latency-ms', type=float, default=0, help='Delay added to every call')
+
+    def handle(self, *args, **options):
+        api = FakeBotApi(latency=options['latency_ms'] / 1000)
+
+        async def serve():
+            server = await asyncio.start_server(api.handle, options['host'], options['port'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Fake Bot API on http://{options['host']}:{options['port']} - point the bot at it with "
+                f"TELEGRAM_API_BASE_URL=http://{options['host']}:{options['port']}/bot"
+            ))
+            async with server:
+                await server.serve_forever()
+
+        try:
+            asyncio.run(serve())
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f"Calls: {api.calls}")
@@ -0,0 +1,132 @@
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from django.core.management.base import BaseCommand, CommandError
+from meabot.google_sheets import _read_tab, append_tab_rows, fetch_student_discounts
+from meabot.schema import SCHEMAS, header_index, parse_rows
+from meabot.tenants import get_default_source, get_source
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+def _dedupe_key(organization):
+    return re.sub(r'\s+', ' ', organization).strip().casefold()
+
+
+def iter_docx_tables(path):
+    """
+    Yields (table_number, [cell text, ...]) for every table row of a .docx.
+    word/document.xml is parsed incrementally straight from the zip, and the
+    embedded images (word/media/*) are never read. Paragraphs inside one cell
+    are joined with newlines, which split_addresses understands.
+    """
+    table = 0
+    with zipfile.ZipFile(path) as archive, archive.open('word/document.xml') as document:
+        cell, paragraph, row = None, None, None
+        for event, elem in ET.iterparse(document, events=('start', 'end')):
+            tag = elem.tag
+            if event == 'start':
+                if tag == W + 'tbl':
+                    table += 1
+                elif tag == W + 'tr':
+                    row = []
+                elif tag == W + 'tc':
+                    cell = []
+                elif tag == W + 'p':
+                    paragraph = []
+                continue
+            if tag == W + 't' and paragraph is not None:
+                paragraph.append(elem.text or '')
+            elif tag == W + 'p':
+                if cell is not None:
+                    cell.append(''.join(paragraph or []))
+                paragraph = None
+            elif tag == W + 'tc':
+                if row is not None:
+                    row.append('\n'.join(p for p in cell if p.strip()))
+                cell = None
+            elif tag == W + 'tr':
+                yield table, row
+                row = None
+                elem.clear()
+            elif tag == W + 'tbl':
+                elem.clear()
+
+
+class Command(BaseCommand):
+    help = 'Import discount tables from a .docx into the Discounts sheet, skipping organizations already listed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='The .docx file, e.g. "Spring\' 25 Discounts for NU STUDENTS.docx"')
+        parser.add_argument('--tenant', default=None, help='Tenant whose sheet receives the rows (default tenant if omitted)')
+        parser.add_argument('--category', default='', help='Category for rows outside any category heading')
+        parser.add_argument('--dry-run', action='store_true', help='Parse and report, but do not write to the sheet')
+
+    def handle(self, *args, **options):
+        source = get_source(options['tenant']) if options['tenant'] else get_default_source()
+        if source is None:
+            raise CommandError(f"Unknown tenant: {options['tenant']}")
+
+        schema = SCHEMAS['discounts']
+        values = [['Organization', 'Addresses', 'Discount', 'Details', 'Instagram', 'Category']]
+        fields = ('organization', 'addresses', 'discount', 'details', 'instagram', 'category')
+        current_table, index, category = None, None, options['category']
+        try:
+            for table, cells in iter_docx_tables(options['path']):
+                if table != current_table:
+                    # First row of every table is its header, spelled like a sheet header
+                    current_table, index = table, header_index(schema, cells, {})
+                    if index is None:
+                        self.stdout.write(self.style.WARNING(
+                            f"Skipping table {table}: header {cells!r} has no organization column"
+                        ))
+                    continue
+                if index is None:
+                    continue
+                if len(cells) == 1 and cells[0].strip():
+                    # A row with one (merged) cell acts as a category heading
+                    category = cells[0].strip()
+                    continue
+                row = {f: cells[i] for f, i in index.items() if i < len(cells)}
+                if not row.get('category', '').strip():
+                    row['category'] = category
+                values.append([row.get(f, '') for f in fields])
+        except (OSError, KeyError, zipfile.BadZipFile, ET.ParseError) as e:
+            raise CommandError(f"Could not read {options['path']}: {e}")
+
+        # Same normalizers as sheet rows: stripped text, split addresses, category keys
+        parsed = parse_rows(schema, values)
+        for row_number, reason in parsed.rejected:
+            self.stdout.write(self.style.WARNING(f"Skipping document row {row_number - 1}: {reason}"))
+
+        # Read the tab directly: fetch_student_discounts turns a failed read into
+        # an empty list, which would import every row a second time
+        try:
+            existing = {_dedupe_key(d.organization) for d in _read_tab(source, 'discounts')}
+        except Exception as e:
+            raise CommandError(f"Could not read the {source.tabs['discounts']} tab: {e}")
+        new_rows = []
+        for record in parsed.records:
+            key = _dedupe_key(record.organization)
+            if key in existing:
+                continue
+            existing.add(key)
+            new_rows.append({
+                'organization': record.organization,
+                'addresses': '\n'.join(record.addresses),
+                'discount': record.discount,
+                'details': record.details,
+                'instagram': record.instagram,
+                'category': record.category,
+            })
+
+        skipped = len(parsed.records) - len(new_rows)
+        self.stdout.write(f"Parsed {len(parsed.records)} discounts, {skipped} already in the sheet.")
+        if options['dry_run']:
+            for row in new_rows:
+                self.stdout.write(f"  + {row['organization']} ({row['discount']})")
+            return
+
+        written = append_tab_rows('discounts', new_rows, source)
+        fetch_student_discounts(force=True, source=source)
+        self.stdout.write(self.style.SUCCESS(f"Imported {written} new discounts into {source.tabs['discounts']}."))
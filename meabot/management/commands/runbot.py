@@ -0,0 +1,59 @@
+import os
+import asyncio
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+
+class Command(BaseCommand):
+    help = 'Run the bot with long polling instead of the Django webhook (no ngrok needed).'
+    # System checks import the URLconf and with it meabot.bot, which builds the
+    # application; they run from handle() once the concurrency is settled.
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrent-updates', type=int, default=None,
+                            help='Updates processed in parallel (default: MEABOT_CONCURRENT_UPDATES or 16)')
+        parser.add_argument('--poll-timeout', type=int, default=30, help='Long-polling timeout in seconds')
+        parser.add_argument('--drop-pending-updates', action='store_true',
+                            help='Skip updates that queued up while the bot was down')
+
+    def handle(self, *args, **options):
+        # The application is built when meabot.bot is imported, so settle the
+        # concurrency before importing it.
+        concurrency = options['concurrent_updates']
+        if concurrency is None:
+            concurrency = int(os.environ.get('MEABOT_CONCURRENT_UPDATES') or 16)
+        os.environ['MEABOT_CONCURRENT_UPDATES'] = str(concurrency)
+        self.check()
+
+        from telegram import Update
+        from meabot.bot import application
+        from meabot import analytics, metrics, scheduler
+
+        if application.concurrent_updates != concurrency:
+            raise CommandError(
+                f"meabot.bot was imported before the concurrency was set "
+                f"({application.concurrent_updates} instead of {concurrency})"
+            )
+
+        async def post_init(app):
+            scheduler.start()
+
+        async def post_shutdown(app):
+            # In-flight updates are drained by Application.stop() before this runs
+            await scheduler.stop()
+            await sync_to_async(analytics.flush)()
+            await asyncio.to_thread(metrics.flush)
+
+        application.post_init = post_init
+        application.post_shutdown = post_shutdown
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Polling for updates with {concurrency} concurrent update(s). Press Ctrl+C to stop."
+        ))
+        # Starting to poll removes the webhook; set it again when going back to webhook mode.
+        application.run_polling(
+            timeout=options['poll_timeout'],
+            drop_pending_updates=options['drop_pending_updates'],
+            allowed_updates=Update.ALL_TYPES,
+        )
+        self.stdout.write("Bot stopped.")
@@ -0,0 +1,54 @@
+import os
+import json
+import hmac
+import uuid
+import hashlib
+import urllib.request
+import urllib.error
+from django.core.management.base import BaseCommand, CommandError
+
+# The same notification from the spreadsheet side, as an installable Apps
+# Script trigger (Extensions > Apps Script, then add an "On edit" trigger):
+#
+#   function notifyBot(e) {
+#     if (e.range.getSheet().getName() !== 'Questions') return;
+#     var rows = [];
+#     for (var r = e.range.getRow(); r <= e.range.getLastRow(); r++) rows.push(r);
+#     var body = JSON.stringify({tenant: 'default', rows: rows, event_id: Utilities.getUuid()});
+#     var sig = Utilities.computeHmacSha256Signature(body, SECRET)
+#       .map(function (b) { return ('0' + (b & 0xff).toString(16)).slice(-2); }).join('');
+#     UrlFetchApp.fetch(URL + '/meabot/sheet_changed/', {
+#       method: 'post', contentType: 'application/json', payload: body,
+#       headers: {'X-Meabot-Signature': 'sha256=' + sig}, muteHttpExceptions: true
+#     });
+#   }
+
+class Command(BaseCommand):
+    help = 'Send a signed Questions-tab change notification to /meabot/sheet_changed/, as the sheet trigger would.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('rows', nargs='+', type=int, help='Edited sheet row numbers')
+        parser.add_argument('--url', default='http://127.0.0.1:8000/meabot/sheet_changed/')
+        parser.add_argument('--tenant', default='default')
+        parser.add_argument('--event-id', default=None, help='Reuse an id to test duplicate suppression')
+
+    def handle(self, *args, **options):
+        secret = os.environ.get('MEABOT_NOTIFY_SECRET')
+        if not secret:
+            raise CommandError('MEABOT_NOTIFY_SECRET is not set')
+
+        body = json.dumps({
+            'tenant': options['tenant'],
+            'rows': options['rows'],
+            'event_id': options['event_id'] or uuid.uuid4().hex,
+        }).encode()
+        signature = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+        request = urllib.request.Request(options['url'], data=body, method='POST', headers={
+            'Content-Type': 'application/json',
+            'X-Meabot-Signature': f'sha256={signature}',
+        })
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                self.stdout.write(self.style.SUCCESS(f"{response.status} {response.read().decode()}"))
+        except urllib.error.HTTPError as e:
+            raise CommandError(f"{e.code} {e.read().decode()}")
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from meabot.models import ItemView
+
+class Command(BaseCommand):
+    help = 'Show the most viewed discounts, exchanges and internships.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', default=None, help='Only this tenant (default: all)')
+        parser.add_argument('--kind', choices=['discounts', 'exchanges', 'internships'], default=None)
+        parser.add_argument('--limit', type=int, default=10, help='Rows per kind')
+
+    def handle(self, *args, **options):
+        views = ItemView.objects.all()
+        if options['tenant']:
+            views = views.filter(tenant=options['tenant'])
+        kinds = [options['kind']] if options['kind'] else ['discounts', 'exchanges', 'internships']
+
+        for kind in kinds:
+            rows = views.filter(kind=kind)
+            total = rows.aggregate(total=Sum('count'))['total'] or 0
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{kind.title()} ({total} views)"))
+            for item in rows.order_by('-count')[:options['limit']]:
+                self.stdout.write(f"  {item.count:>7}  {item.key}  [{item.tenant}]")
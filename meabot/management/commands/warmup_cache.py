@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.core.cache import cache
-from meabot.google_sheets import fetch_student_discounts, fetch_exchange_opportunities, fetch_internships
+from meabot.google_sheets import refresh_sheet_caches
+from meabot.tenants import get_sources
 
 class Command(BaseCommand):
     help = 'Preload essential data into cache'
@@ -9,9 +10,8 @@ class Command(BaseCommand):
         self.stdout.write("Warming up cache (discounts, exchanges, internships)...")
         try:
             # Each fetch_* function sets cache internally.
-            fetch_student_discounts()
-            fetch_exchange_opportunities()
-            fetch_internships()
+            for source in get_sources().values():
+                refresh_sheet_caches(source)
             self.stdout.write(self.style.SUCCESS('Cache warmed up successfully'))
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'Cache warmup failed: {e}'))
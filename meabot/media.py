@@ -0,0 +1,96 @@
+# meabot/media.py
+
+import os
+import logging
+from asgiref.sync import sync_to_async
+from telegram.error import BadRequest
+
+from .models import MediaFile
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Private chat/channel the bot may post to; media is pre-uploaded there in the
+# background so users never wait on the first upload. Optional.
+MEDIA_CACHE_CHAT_ID = os.environ.get('MEABOT_MEDIA_CACHE_CHAT_ID')
+
+CAPTION_LIMIT = 1024
+
+# (bot_id, url) -> file_id, in front of the MediaFile table
+_file_ids = {}
+
+
+def _load_file_id(bot_id, url):
+    return MediaFile.objects.filter(bot_id=bot_id, url=url).values_list('file_id', flat=True).first()
+
+
+def _store_file_id(bot_id, url, file_id):
+    MediaFile.objects.update_or_create(bot_id=bot_id, url=url, defaults={'file_id': file_id})
+
+
+async def get_file_id(bot, url):
+    key = (bot.id, url)
+    if key not in _file_ids:
+        file_id = await sync_to_async(_load_file_id)(bot.id, url)
+        if not file_id:
+            return None
+        _file_ids[key] = file_id
+    return _file_ids[key]
+
+
+async def remember_file_id(bot, url, message):
+    """Stores the file_id Telegram assigned to the photo in `message`."""
+    if not message or not message.photo:
+        return
+    file_id = message.photo[-1].file_id
+    _file_ids[(bot.id, url)] = file_id
+    await sync_to_async(_store_file_id)(bot.id, url, file_id)
+
+
+async def forget_file_id(bot, url):
+    """Drops a file_id Telegram no longer accepts, so the next send re-uploads."""
+    _file_ids.pop((bot.id, url), None)
+    await sync_to_async(MediaFile.objects.filter(bot_id=bot.id, url=url).delete)()
+
+
+async def send_photo(bot, chat_id, url, **kwargs):
+    """
+    Sends the image at `url`, by cached file_id when we have one; the first
+    send lets Telegram fetch the URL and the resulting file_id is kept. A
+    file_id Telegram rejects is dropped and the URL sent again.
+    """
+    file_id = await get_file_id(bot, url)
+    if file_id:
+        try:
+            message = await bot.send_photo(chat_id=chat_id, photo=file_id, **kwargs)
+            metrics.incr('media_file_id_hits')
+            return message
+        except BadRequest as e:
+            if "file identifier" not in str(e).lower():
+                raise
+            logger.warning("Stale file_id for %s, uploading again: %s", url, e)
+            await forget_file_id(bot, url)
+    message = await bot.send_photo(chat_id=chat_id, photo=url, **kwargs)
+    metrics.incr('media_uploads')
+    await remember_file_id(bot, url, message)
+    return message
+
+
+async def prefetch_media(bot, records):
+    """
+    Uploads every not-yet-cached image of `records` to MEDIA_CACHE_CHAT_ID and
+    deletes the message again, leaving only the cached file_id behind.
+    """
+    if not MEDIA_CACHE_CHAT_ID:
+        return 0
+    uploaded = 0
+    for url in {r.media for r in records if r.media}:
+        if await get_file_id(bot, url):
+            continue
+        try:
+            message = await send_photo(bot, MEDIA_CACHE_CHAT_ID, url, disable_notification=True)
+            await message.delete()
+            uploaded += 1
+        except Exception as e:
+            logger.warning("Could not pre-upload %s: %s", url, e)
+    return uploaded
@@ -0,0 +1,43 @@
+# meabot/metrics.py
+
+import logging
+import threading
+from collections import Counter
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+METRICS_PREFIX = "metrics:"
+
+# Per-process counters. Handlers increment them on the event loop, but Sheets
+# work in pool threads counts too and flush() swaps the dict from a thread, so
+# both go through a lock; it is uncontended and never held across I/O.
+_counters = Counter()
+_lock = threading.Lock()
+
+
+def incr(name, amount=1):
+    with _lock:
+        _counters[name] += amount
+
+
+def flush():
+    """
+    Adds the counts collected since the last flush to the shared cache totals
+    and resets the local buffer. Returns the flushed counts.
+    """
+    global _counters
+    with _lock:
+        pending, _counters = _counters, Counter()
+    for name, value in pending.items():
+        key = METRICS_PREFIX + name
+        try:
+            if not cache.add(key, value, None):
+                cache.incr(key, value)
+        except ValueError:
+            # Key vanished between add() and incr(); start over from this batch.
+            cache.set(key, value, None)
+        except Exception as e:
+            logger.error("Failed to flush metric %s: %s", name, e)
+    return pending
+
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.5 on 2026-10-19 19:29
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Question',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tenant', models.CharField(default='default', max_length=64)),
+                ('user_id', models.BigIntegerField()),
+                ('username', models.CharField(blank=True, max_length=255)),
+                ('question', models.TextField()),
+                ('answer', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('answered', 'Answered'), ('sent', 'Sent')], default='pending', max_length=16)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('sheet_row', models.PositiveIntegerField(blank=True, null=True)),
+                ('sheet_dirty', models.BooleanField(default=False)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tenant', 'status'], name='meabot_ques_tenant_e91d68_idx'), models.Index(fields=['user_id'], name='meabot_ques_user_id_cc1951_idx'), models.Index(fields=['tenant', 'sheet_row'], name='meabot_ques_tenant_c6b520_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.5 on 2026-10-19 19:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meabot', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemView',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tenant', models.CharField(default='default', max_length=64)),
+                ('kind', models.CharField(max_length=32)),
+                ('key', models.CharField(max_length=255)),
+                ('count', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tenant', 'kind', 'key'), name='unique_item_view')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.5 on 2026-10-19 19:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meabot', '0003_mediafile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='admin_chat_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='admin_message_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['admin_chat_id', 'admin_message_id'], name='meabot_ques_admin_c_0f3596_idx'),
+        ),
+    ]
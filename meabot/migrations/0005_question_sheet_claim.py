@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-19 19:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meabot', '0004_question_admin_message'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='sheet_claim',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='sheet_claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-19 19:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meabot', '0005_question_sheet_claim'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='answer_dirty',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,89 @@
+# meabot/models.py
+
+from django.db import models
+from django.utils import timezone
+
+
+class Question(models.Model):
+    """
+    A question submitted with /ask. Written here first; the Questions tab of
+    the tenant's spreadsheet is kept in sync by meabot/questions.py.
+    """
+    PENDING = 'pending'
+    ANSWERED = 'answered'
+    SENT = 'sent'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (ANSWERED, 'Answered'),
+        (SENT, 'Sent'),
+    ]
+
+    tenant = models.CharField(max_length=64, default='default')
+    user_id = models.BigIntegerField()
+    username = models.CharField(max_length=255, blank=True)
+    question = models.TextField()
+    answer = models.TextField(blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=PENDING)
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    # Row in the Questions tab; null until the question has been mirrored there
+    sheet_row = models.PositiveIntegerField(null=True, blank=True)
+    # Local changes (answer, Sent flag) not yet written back to the sheet
+    sheet_dirty = models.BooleanField(default=False)
+    # The answer itself came from the admin chat and must be written to the
+    # sheet too; otherwise only the Sent flag is, so staff edits stay
+    answer_dirty = models.BooleanField(default=False)
+    # Set while one worker appends the question to the sheet, so a concurrent
+    # sync does not append it a second time
+    sheet_claim = models.CharField(max_length=32, blank=True)
+    sheet_claimed_at = models.DateTimeField(null=True, blank=True)
+    # The copy of the question posted to the tenant's admin chat, if any
+    admin_chat_id = models.BigIntegerField(null=True, blank=True)
+    admin_message_id = models.BigIntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'status']),
+            models.Index(fields=['user_id']),
+            models.Index(fields=['tenant', 'sheet_row']),
+            models.Index(fields=['admin_chat_id', 'admin_message_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.question[:50]}"
+
+
+class ItemView(models.Model):
+    """Aggregated number of detail views per discount / exchange / internship."""
+    tenant = models.CharField(max_length=64, default='default')
+    kind = models.CharField(max_length=32)
+    key = models.CharField(max_length=255)
+    count = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'kind', 'key'], name='unique_item_view'),
+        ]
+
+    def __str__(self):
+        return f"{self.tenant}/{self.kind}/{self.key}: {self.count}"
+
+
+class MediaFile(models.Model):
+    """
+    Telegram file_id of an image URL, so each image is uploaded only once.
+    file_ids are only valid for the bot that uploaded them, hence bot_id.
+    """
+    bot_id = models.BigIntegerField()
+    url = models.URLField(max_length=1000)
+    file_id = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['bot_id', 'url'], name='unique_media_file'),
+        ]
+
+    def __str__(self):
+        return self.url
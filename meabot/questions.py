@@ -0,0 +1,340 @@
+# meabot/questions.py
+
+import uuid
+import logging
+import datetime
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Question
+from .render import escape, PARSE_MODE
+from . import google_sheets, metrics
+
+logger = logging.getLogger(__name__)
+
+SYNC_BATCH_SIZE = 500
+# A claim older than this is from a worker that died mid-append; take it over
+SHEET_CLAIM_TIMEOUT = datetime.timedelta(minutes=5)
+
+
+async def record_question(user_id, username, question_text, source):
+    """Stores a new question locally; the reconciler mirrors it to the sheet."""
+    return await Question.objects.acreate(
+        tenant=source.key,
+        user_id=user_id,
+        username=username,
+        question=question_text,
+    )
+
+
+def push_new_questions(source):
+    """
+    Appends every question not yet in the sheet with one append call. The
+    rows are claimed first with a conditional update, so two workers (or a
+    notification racing the sweep) never append the same question twice.
+    """
+    now = timezone.now()
+    unclaimed = Question.objects.filter(tenant=source.key, sheet_row__isnull=True).filter(
+        Q(sheet_claimed_at__isnull=True) | Q(sheet_claimed_at__lt=now - SHEET_CLAIM_TIMEOUT)
+    )
+    ids = list(unclaimed.order_by('id').values_list('id', flat=True)[:SYNC_BATCH_SIZE])
+    if not ids:
+        return 0
+    token = uuid.uuid4().hex
+    unclaimed.filter(id__in=ids).update(sheet_claim=token, sheet_claimed_at=now)
+    new = list(Question.objects.filter(sheet_claim=token, sheet_row__isnull=True).order_by('id'))
+    if not new:
+        return 0
+    rows = []
+    for q in new:
+        # Answered from the admin chat before it reached the sheet, or not yet
+        answer, sent = (q.answer, "yes" if q.status == Question.SENT else "") if q.answer else ("", "")
+        # Column G keys the row to the local question, even if staff sort the tab
+        rows.append([q.created_at.isoformat(), q.user_id, q.username, q.question, answer, sent, q.id])
+    try:
+        first_row = google_sheets.append_question_rows(rows, source)
+    except Exception:
+        Question.objects.filter(sheet_claim=token).update(sheet_claim="", sheet_claimed_at=None)
+        raise
+    for offset, q in enumerate(new):
+        q.sheet_row = first_row + offset
+        q.sheet_dirty = q.answer_dirty = False
+        q.sheet_claim, q.sheet_claimed_at = "", None
+    Question.objects.bulk_update(
+        new, ['sheet_row', 'sheet_dirty', 'answer_dirty', 'sheet_claim', 'sheet_claimed_at']
+    )
+    return len(new)
+
+
+def _row_id(value):
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        return None
+
+
+def _same_question(q, user_id, question_text):
+    return _row_id(user_id) == q.user_id and q.question.strip() == question_text.strip()
+
+
+def _apply_sheet_rows(source, rows, by_id, by_row):
+    """
+    Folds Questions rows into the local table: answers typed into column E
+    are picked up, rows added by hand are imported. A row is matched by the
+    question id in column G; rows without one (older or hand-added rows)
+    are matched by `by_row` only if their UserID and Question agree, and get
+    their id written back. A row that matches nothing safely is skipped.
+    """
+    to_create, to_update, ids_to_write = [], [], []
+    seen = set()
+    for row_number, (timestamp, user_id, username, question_text, answer_text, sent, row_id) in rows:
+        answer_text = answer_text.strip()
+        already_sent = sent.strip().lower() == "yes"
+        question_id = _row_id(row_id)
+        if question_id is not None:
+            q = by_id.get(question_id)
+            if q is None or question_id in seen:
+                logger.warning("Questions row %d of %s has unknown or repeated id %s; skipped",
+                               row_number, source.key, question_id)
+                continue
+        else:
+            q = by_row.get(row_number)
+            if q is not None and not _same_question(q, user_id, question_text):
+                logger.warning("Questions row %d of %s no longer holds question %s; skipped",
+                               row_number, source.key, q.id)
+                metrics.incr('sheet_conflicts')
+                continue
+        if q is None:
+            try:
+                user_id = int(user_id)
+            except (TypeError, ValueError):
+                continue
+            status = Question.SENT if already_sent else Question.ANSWERED if answer_text else Question.PENDING
+            to_create.append(Question(
+                tenant=source.key, user_id=user_id, username=username,
+                question=question_text, answer=answer_text, status=status, sheet_row=row_number,
+            ))
+            continue
+        seen.add(q.id)
+        changed = False
+        if question_id is None:
+            ids_to_write.append((row_number, q.id))
+        if q.sheet_row != row_number:
+            # The row moved (sorted or rows deleted above it)
+            q.sheet_row = row_number
+            changed = True
+        if q.status == Question.PENDING and answer_text:
+            q.answer = answer_text
+            q.status = Question.SENT if already_sent else Question.ANSWERED
+            changed = True
+        elif q.status == Question.ANSWERED and already_sent:
+            # Delivered by another worker or marked by hand
+            q.status = Question.SENT
+            changed = True
+        if changed:
+            to_update.append(q)
+    created = Question.objects.bulk_create(to_create, batch_size=SYNC_BATCH_SIZE)
+    Question.objects.bulk_update(to_update, ['answer', 'status', 'sheet_row'], batch_size=SYNC_BATCH_SIZE)
+    ids_to_write += [(q.sheet_row, q.id) for q in created if q.id is not None]
+    google_sheets.write_question_ids(ids_to_write, source)
+    return len(to_create) + len(to_update)
+
+
+def _known_questions(source, rows=None):
+    """
+    The mirrored questions of a tenant (or those the given rows refer to),
+    indexed by id and by sheet row.
+    """
+    questions = Question.objects.filter(tenant=source.key, sheet_row__isnull=False)
+    if rows is not None:
+        ids = {_row_id(row[6]) for _, row in rows} - {None}
+        questions = Question.objects.filter(tenant=source.key).filter(
+            Q(id__in=ids) | Q(sheet_row__in=[n for n, _ in rows])
+        )
+    questions = list(questions.only('id', 'sheet_row', 'status', 'answer', 'user_id', 'question'))
+    return {q.id: q for q in questions}, {q.sheet_row: q for q in questions if q.sheet_row}
+
+
+def pull_answers(source):
+    """Reads the whole Questions tab once and folds it into the local table."""
+    rows = google_sheets.read_question_rows(source)
+    return _apply_sheet_rows(source, rows, *_known_questions(source))
+
+
+def pull_rows(source, row_numbers):
+    """Like pull_answers, but reads only the given sheet rows (one batchGet)."""
+    rows = google_sheets.read_question_rows(source, row_numbers)
+    return _apply_sheet_rows(source, rows, *_known_questions(source, rows))
+
+
+def push_sent_flags(source):
+    """Writes answers and Sent flags changed locally back to the sheet in one batch."""
+    dirty = list(
+        Question.objects.filter(tenant=source.key, sheet_dirty=True, sheet_row__isnull=False)
+        .only('id', 'sheet_row', 'answer', 'answer_dirty', 'status', 'user_id', 'question')[:SYNC_BATCH_SIZE]
+    )
+    if not dirty:
+        return 0
+    # Only write rows that still hold the same question; a moved row is
+    # re-keyed by the next pull and written then
+    current = dict(google_sheets.read_question_rows(source, [q.sheet_row for q in dirty]))
+    verified = []
+    for q in dirty:
+        row = current.get(q.sheet_row)
+        question_id = _row_id(row[6]) if row else None
+        if row and (question_id == q.id or question_id is None and _same_question(q, row[1], row[3])):
+            verified.append(q)
+        else:
+            logger.warning("Questions row %s of %s no longer holds question %s; write-back deferred",
+                           q.sheet_row, source.key, q.id)
+    google_sheets.write_question_answers(
+        [(q.sheet_row, q.answer if q.answer_dirty else None, q.status == Question.SENT) for q in verified],
+        source,
+    )
+    Question.objects.filter(id__in=[q.id for q in verified]).update(sheet_dirty=False, answer_dirty=False)
+    return len(verified)
+
+
+def _answer_message(q):
+    # HTML with escaped text: a stray * or _ in an answer must not make
+    # Telegram reject the message (and the sweep retry it forever)
+    return (
+        "✅ <b>Answer Received</b>\n\n"
+        f"<b>Your question:</b> {escape(q.question)}\n\n"
+        f"<b>Our answer:</b> {escape(q.answer)}"
+    )
+
+
+async def deliver_answers(application, source):
+    """Sends answered questions to their askers; an indexed lookup, no sheet access."""
+    pending = [
+        q async for q in Question.objects.filter(tenant=source.key, status=Question.ANSWERED)
+    ]
+    sent = 0
+    for q in pending:
+        # Claim the answer first: if a notification and the polling sweep (or
+        # two workers) race for it, only one of them gets to send it.
+        claimed = await Question.objects.filter(id=q.id, status=Question.ANSWERED).aupdate(
+            status=Question.SENT, sent_at=timezone.now(), sheet_dirty=True
+        )
+        if not claimed:
+            continue
+        try:
+            await application.bot.send_message(
+                chat_id=q.user_id, text=_answer_message(q), parse_mode=PARSE_MODE
+            )
+        except Exception as e:
+            logger.error("Failed to send answer %s to user %s: %s", q.id, q.user_id, e)
+            # Keep any write-back that was already pending
+            await Question.objects.filter(id=q.id).aupdate(
+                status=Question.ANSWERED, sent_at=None, sheet_dirty=q.sheet_dirty
+            )
+            continue
+        metrics.incr('answers_sent')
+        sent += 1
+    return sent
+
+
+def _close_connections_after(func):
+    def run(*args):
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+    return run
+
+
+async def run_sheets_bound(func, *args):
+    """
+    Runs sync work that waits on the Sheets API in a pool thread. Django's
+    single sync thread also serves the async ORM calls of request handling
+    (/ask, admin replies), which must not queue behind a slow Sheets round.
+    """
+    return await sync_to_async(_close_connections_after(func), thread_sensitive=False)(*args)
+
+
+async def reconcile_questions(application, source):
+    """
+    One sync round for a tenant: mirror new questions to the sheet, pull
+    answers, deliver them, then write the Sent flags back.
+    """
+    await run_sheets_bound(push_new_questions, source)
+    await run_sheets_bound(pull_answers, source)
+    await deliver_answers(application, source)
+    await run_sheets_bound(push_sent_flags, source)
+
+
+async def deliver_notified_rows(application, source, row_numbers):
+    """
+    Handles a change notification for some Questions rows: reads just those
+    rows, delivers any new answers and writes their Sent flags back.
+    """
+    await run_sheets_bound(pull_rows, source, row_numbers)
+    sent = await deliver_answers(application, source)
+    await run_sheets_bound(push_sent_flags, source)
+    return sent
+
+
+def push_sheet_changes(source):
+    """Write-back only: new questions and locally answered rows, no reads."""
+    push_new_questions(source)
+    push_sent_flags(source)
+
+
+# --------------------------
+# Admin chat: questions are posted there, replies are the answers
+# --------------------------
+async def post_to_admin_chat(bot, question, source):
+    """
+    Posts a new question into the tenant's admin chat and remembers the
+    message, so a reply to it can be routed back to the asker.
+    """
+    if not source.admin_chat_id:
+        return None
+    username = f"@{question.username}" if question.username and question.username != "N/A" else "no username"
+    text = (
+        f"❓ Question #{question.id} from {username} (id {question.user_id})\n\n"
+        f"{question.question}\n\n"
+        "↩️ Reply to this message to answer."
+    )
+    try:
+        message = await bot.send_message(chat_id=source.admin_chat_id, text=text)
+    except Exception as e:
+        logger.error("Failed to post question %s to admin chat %s: %s", question.id, source.admin_chat_id, e)
+        return None
+    await Question.objects.filter(id=question.id).aupdate(
+        admin_chat_id=message.chat_id, admin_message_id=message.message_id
+    )
+    return message
+
+
+async def answer_from_admin_chat(bot, chat_id, message_id, answer_text):
+    """
+    Delivers an admin's reply to the asker right away. The sheet is not
+    touched here; the answer and Sent flag are written back in the next
+    batched push. Returns the question, or None if the reply did not match
+    a question that still awaits an answer.
+    """
+    q = await Question.objects.filter(admin_chat_id=chat_id, admin_message_id=message_id).afirst()
+    if q is None:
+        return None
+    claimed = await Question.objects.filter(
+        id=q.id, status__in=[Question.PENDING, Question.ANSWERED]
+    ).aupdate(
+        answer=answer_text, status=Question.SENT, sent_at=timezone.now(), sheet_dirty=True, answer_dirty=True
+    )
+    if not claimed:
+        return None
+    q.answer = answer_text
+    try:
+        await bot.send_message(chat_id=q.user_id, text=_answer_message(q), parse_mode=PARSE_MODE)
+    except Exception as e:
+        logger.error("Failed to send answer %s to user %s: %s", q.id, q.user_id, e)
+        # Keep the answer; the regular sweep retries delivery
+        await Question.objects.filter(id=q.id).aupdate(status=Question.ANSWERED, sent_at=None)
+        raise
+    metrics.incr('answers_sent')
+    q.status = Question.SENT
+    return q
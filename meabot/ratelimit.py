@@ -0,0 +1,70 @@
+# meabot/ratelimit.py
+
+import os
+import time
+import logging
+from collections import OrderedDict
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Token bucket per user: `capacity` actions, refilled evenly over `period`
+    seconds. Buckets live in a bounded LRU so memory stays flat however many
+    users show up.
+
+    With shared=True the budget is kept in the Django cache instead (fixed
+    windows via cache.add/incr), so all workers enforce one budget. Only use
+    that with a fast shared cache such as Redis or Memcached, since every
+    check is a cache round trip.
+    """
+
+    def __init__(self, name, capacity, period, max_users=10000, shared=False):
+        self.name = name
+        self.capacity = capacity
+        self.period = period
+        self.rate = capacity / period
+        self.max_users = max_users
+        self.shared = shared
+        self._buckets = OrderedDict()  # user_id -> (tokens, updated_at)
+
+    def allow(self, user_id):
+        if self.shared:
+            return self._allow_shared(user_id)
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.pop(user_id, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated_at) * self.rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[user_id] = (tokens, now)
+        if len(self._buckets) > self.max_users:
+            self._buckets.popitem(last=False)
+        return allowed
+
+    def _allow_shared(self, user_id):
+        window = int(time.time() // self.period)
+        key = f"ratelimit:{self.name}:{user_id}:{window}"
+        try:
+            cache.add(key, 0, int(self.period) + 1)
+            return cache.incr(key) <= self.capacity
+        except Exception as e:
+            # Never lock users out because the cache is unavailable
+            logger.warning("Shared rate limit check failed for %s: %s", self.name, e)
+            return True
+
+
+def _limiter_from_env(name, default):
+    """Budgets are "<actions>/<seconds>", e.g. MEABOT_ASK_RATE=3/600."""
+    capacity, period = os.environ.get(f"MEABOT_{name.upper()}_RATE", default).split("/")
+    return RateLimiter(
+        name, int(capacity), float(period),
+        shared=os.environ.get("MEABOT_RATELIMIT_SHARED", "0") == "1",
+    )
+
+
+# Question submissions are expensive (sheet writes, staff time); navigation is cheap
+ask_limiter = _limiter_from_env("ask", "3/600")
+nav_limiter = _limiter_from_env("nav", "30/60")
@@ -0,0 +1,121 @@
+# meabot/records.py
+
+import sys
+from dataclasses import dataclass
+
+# Values that repeat across many rows (categories, cities, departments...) are
+# interned so every worker keeps a single copy of each distinct string.
+_intern = sys.intern
+
+
+@dataclass(frozen=True, slots=True)
+class Exchange:
+    program_name: str
+    partner_university: str
+    who_can_apply: str
+    start_reg: str
+    end_reg: str
+    duration: str
+    website: str
+    media: str = ""
+
+    @classmethod
+    def from_row(cls, row):
+        program_name, partner_university, who_can_apply, start_reg, end_reg, duration, website, media = row[:8]
+        return cls(
+            program_name,
+            _intern(partner_university),
+            _intern(who_can_apply),
+            _intern(start_reg),
+            _intern(end_reg),
+            _intern(duration),
+            website,
+            media,
+        )
+
+    def to_row(self):
+        return (
+            self.program_name, self.partner_university, self.who_can_apply,
+            self.start_reg, self.end_reg, self.duration, self.website, self.media,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class Internship:
+    internship_program: str
+    field_department: str
+    duration_details: str
+    location: str
+    application_deadline: str
+    application_link: str
+    media: str = ""
+
+    @classmethod
+    def from_row(cls, row):
+        program, field_department, duration_details, location, deadline, link, media = row[:7]
+        return cls(
+            program,
+            _intern(field_department),
+            duration_details,
+            _intern(location),
+            _intern(deadline),
+            link,
+            media,
+        )
+
+    def to_row(self):
+        return (
+            self.internship_program, self.field_department, self.duration_details,
+            self.location, self.application_deadline, self.application_link, self.media,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class Discount:
+    organization: str
+    addresses: tuple
+    discount: str
+    details: str
+    instagram: str
+    category: str
+    category_key: str
+    media: str = ""
+
+    @classmethod
+    def from_row(cls, row):
+        organization, addresses, discount, details, instagram, category, category_key, media = row[:8]
+        return cls(
+            organization,
+            tuple(addresses),
+            _intern(discount),
+            details,
+            instagram,
+            _intern(category),
+            _intern(category_key),
+            media,
+        )
+
+    def to_row(self):
+        return (
+            self.organization, self.addresses, self.discount,
+            self.details, self.instagram, self.category, self.category_key, self.media,
+        )
+
+
+# Part of every cache key holding packed records. Bump it whenever a to_row()
+# layout changes, so workers never unpack tuples written by an older release.
+FORMAT_VERSION = 2
+
+
+def pack(records):
+    """
+    Serialize records to a tuple of plain tuples. Pickling bare tuples is much
+    smaller and faster than pickling one object (class ref + state) per row.
+    """
+    return tuple(r.to_row() for r in records)
+
+
+def unpack(cls, packed):
+    """Rebuild records from pack() output, re-interning repeated values."""
+    from_row = cls.from_row
+    return [from_row(row) for row in packed]
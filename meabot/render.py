@@ -0,0 +1,218 @@
+# meabot/render.py
+
+import re
+import html
+import logging
+from dataclasses import dataclass
+
+from .records import Exchange, Internship, Discount
+
+logger = logging.getLogger(__name__)
+
+# Telegram's limit for one text message, in UTF-16 code units (emoji count
+# twice). Checked on the HTML source, which is never shorter than the text
+# Telegram counts, so parts always fit.
+MESSAGE_LIMIT = 4096
+# Rendered records kept per process; when exceeded the cache starts over.
+CACHE_SIZE = 10000
+
+PARSE_MODE = "HTML"
+
+
+def escape(value):
+    """Escapes sheet text for HTML parse mode; `*`, `_` and backticks need nothing."""
+    return html.escape(str(value), quote=False)
+
+
+def link(url, label):
+    """An <a> tag for http(s) URLs; anything else is shown as plain text."""
+    url = (url or "").strip()
+    if url.lower().startswith(("http://", "https://")):
+        return f'<a href="{html.escape(url, quote=True)}">{escape(label)}</a>'
+    return escape(url)
+
+
+@dataclass(frozen=True, slots=True)
+class RenderedMessage:
+    parts: tuple          # one or more texts, each within MESSAGE_LIMIT
+    parse_mode: str = PARSE_MODE
+
+
+def telegram_length(text):
+    return len(text.encode("utf-16-le")) // 2
+
+
+_TAG = re.compile(r"<(/?)([a-zA-Z]+)[^>]*>")
+
+
+def _split_line(line, limit):
+    # Cut an over-long line after a space if there is one in the second half,
+    # and never inside an &entity; or a <tag>
+    while telegram_length(line) > limit:
+        cut = limit
+        while telegram_length(line[:cut]) > limit:
+            # Each surplus unit is at most one astral character (two units)
+            cut -= max(1, (telegram_length(line[:cut]) - limit + 1) // 2)
+        space = max(line.rfind(" ", cut // 2, cut), line.rfind("\t", cut // 2, cut))
+        if space > 0:
+            cut = space + 1
+        amp = line.rfind("&", max(0, cut - 10), cut)  # entities are short
+        if amp > 0 and line.find(";", amp, cut) == -1:
+            cut = amp
+        lt = line.rfind("<", 0, cut)
+        if lt > 0 and lt > line.rfind(">", 0, cut):
+            cut = lt
+        yield line[:cut]
+        line = line[cut:]
+    yield line
+
+
+def _open_tags(piece, stack):
+    """The stack of (name, opening tag) still open after `piece`."""
+    stack = list(stack)
+    for match in _TAG.finditer(piece):
+        closing, name = match.group(1), match.group(2).lower()
+        if not closing:
+            stack.append((name, match.group(0)))
+            continue
+        for i in range(len(stack) - 1, -1, -1):
+            if stack[i][0] == name:
+                del stack[i]
+                break
+    return stack
+
+
+def _closers(stack):
+    return "".join(f"</{name}>" for name, _ in reversed(stack))
+
+
+def split_message(text, limit=MESSAGE_LIMIT):
+    """
+    Splits a rendered message into parts of at most `limit` characters at
+    line breaks, or at spaces within a line too long for one part. Tags
+    still open at a split (a <code> cell spanning lines, say) are closed at
+    the end of the part and reopened at the start of the next one, so every
+    part is valid HTML on its own.
+    """
+    if telegram_length(text) <= limit:
+        return (text,)
+    parts, current, stack = [], "", []
+    for n, line in enumerate(text.split("\n")):
+        # Half the limit leaves room for the tags reopened in front of a piece;
+        # pieces of one line are joined back without a separator
+        for i, piece in enumerate(_split_line(line, limit // 2)):
+            after = _open_tags(piece, stack)
+            candidate = current + ("\n" if n and not i else "") + piece
+            if current and telegram_length(candidate + _closers(after)) > limit:
+                parts.append(current + _closers(stack))
+                candidate = "".join(tag for _, tag in stack) + piece
+            current, stack = candidate, after
+    if current:
+        parts.append(current + _closers(stack))
+    return tuple(p for p in parts if _TAG.sub("", p).strip()) or (text[:limit],)
+
+
+# --------------------------
+# Detail templates
+# --------------------------
+NEED_MORE_INFO = "<i>Need more info? Use</i> /ask <i>to contact us!</i> 💬"
+
+
+def exchange_details(opp):
+    lines = [
+        f"🎓 <b>{escape(opp.program_name)}</b>",
+        "",
+        "🌟 <b>Program Details:</b>",
+        "",
+        "🏛️ <b>Partner University:</b>",
+        f"<code>{escape(opp.partner_university)}</code>",
+        "",
+        "🎯 <b>Eligibility:</b>",
+        f"<code>{escape(opp.who_can_apply)}</code>",
+        "",
+        "🗓️ <b>Registration Period:</b>",
+        f"<code>{escape(opp.start_reg)}  →  {escape(opp.end_reg)}</code>",
+        "",
+        "⏳ <b>Program Duration:</b>",
+        f"<code>{escape(opp.duration)}</code>",
+        "",
+    ]
+    if opp.website:
+        lines += [f"🌐 <b>Official Website:</b> {link(opp.website, 'Visit Site')}", ""]
+    lines.append(NEED_MORE_INFO)
+    return "\n".join(lines)
+
+
+def internship_details(internship):
+    lines = [
+        f"🏢 <b>{escape(internship.internship_program)}</b>",
+        "",
+        f"📚 <b>Field/Department:</b> {escape(internship.field_department)}",
+        "",
+        "⏳ <b>Duration &amp; Details:</b>",
+        escape(internship.duration_details),
+        "",
+        f"📍 <b>Location:</b> {escape(internship.location)}",
+        "",
+        f"📅 <b>Application Deadline:</b> {escape(internship.application_deadline)}",
+        "",
+    ]
+    if internship.application_link:
+        lines += [f"🔗 <b>Application Link:</b> {link(internship.application_link, 'Apply Here')}", ""]
+    lines.append(NEED_MORE_INFO)
+    return "\n".join(lines)
+
+
+def discount_details(discount):
+    lines = [
+        f"🏢 <b>{escape(discount.organization)}</b>",
+        "",
+        f"💰 <b>Discount:</b> <code>{escape(discount.discount)}</code>",
+        "",
+        "📌 <b>Addresses:</b>",
+    ]
+    lines += [f"➖ {escape(address)}" for address in discount.addresses]
+    if discount.details:
+        lines += ["", "📝 <b>Details:</b>", escape(discount.details), ""]
+    instagram = discount.instagram
+    if instagram:
+        if instagram.startswith("@"):
+            user = instagram[1:]
+            formatted_ig = link(f"https://www.instagram.com/{user}/", f"@{user}")
+        else:
+            formatted_ig = link(instagram, instagram) if "://" in instagram else escape(instagram)
+        lines += ["", f"📱 <b>Instagram:</b> {formatted_ig}", ""]
+    lines += ["", "<i>Show student ID to claim!</i>"]
+    return "\n".join(lines)
+
+
+TEMPLATES = {
+    Exchange: exchange_details,
+    Internship: internship_details,
+    Discount: discount_details,
+}
+
+# Records are frozen and compare by value, so an unchanged row keeps its
+# rendering across sheet refreshes and an edited row renders once anew.
+_rendered = {}
+
+
+def render_details(record):
+    """The detail message of a record, rendered once and then looked up."""
+    rendered = _rendered.get(record)
+    if rendered is None:
+        text = TEMPLATES[type(record)](record)
+        rendered = RenderedMessage(split_message(text))
+        if len(rendered.parts) > 1:
+            logger.info("Detail message of %r split into %d parts", record, len(rendered.parts))
+        if len(_rendered) >= CACHE_SIZE:
+            _rendered.clear()
+        _rendered[record] = rendered
+    return rendered
+
+
+def prerender(records):
+    """Renders a freshly loaded dataset ahead of the first views."""
+    for record in records:
+        render_details(record)
+    return len(records)
@@ -0,0 +1,152 @@
+# meabot/scheduler.py
+
+import os
+import uuid
+import random
+import asyncio
+import logging
+from dataclasses import dataclass
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Identifies this worker when taking job locks in the shared cache.
+WORKER_ID = uuid.uuid4().hex
+LOCK_PREFIX = "scheduler_lock:"
+
+
+@dataclass
+class Job:
+    name: str
+    func: object          # async callable taking no arguments
+    interval: float       # seconds between runs
+    jitter: float = 0.1   # +/- fraction of interval, spreads workers apart
+    exclusive: bool = True  # only one worker per interval runs the job
+
+
+_jobs = {}
+_tasks = []
+
+
+def _interval_from_env(name, default):
+    """Reads MEABOT_<NAME>_INTERVAL (seconds); 0 disables the job."""
+    return float(os.environ.get(f"MEABOT_{name.upper()}_INTERVAL", default))
+
+
+def register_job(name, func, interval, jitter=0.1, exclusive=True):
+    """
+    Registers a periodic job. Must be called before start(); jobs with a
+    non-positive interval are ignored.
+    """
+    if interval <= 0:
+        _jobs.pop(name, None)
+        return
+    _jobs[name] = Job(name, func, interval, jitter, exclusive)
+
+
+def _acquire(job):
+    # The lock is left to expire rather than released, so exactly one worker
+    # runs the job per interval window no matter how many workers wake up.
+    ttl = max(1, int(job.interval * (1 - job.jitter)))
+    return cache.add(LOCK_PREFIX + job.name, WORKER_ID, ttl)
+
+
+async def _run_forever(job):
+    while True:
+        delay = job.interval * (1 + random.uniform(-job.jitter, job.jitter))
+        await asyncio.sleep(delay)
+        try:
+            if job.exclusive and not await asyncio.to_thread(_acquire, job):
+                continue
+            await job.func()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Scheduled job %s failed", job.name)
+
+
+def _register_default_jobs():
+    from .google_sheets import (
+        refresh_sheet_caches, fetch_student_discounts, fetch_exchange_opportunities, fetch_internships
+    )
+    from .questions import reconcile_questions, push_sheet_changes, run_sheets_bound
+    from .tenants import get_sources
+    from .bot import application_for_source
+    from . import analytics, faq, media, metrics, render
+
+    # With sheet change notifications (MEABOT_NOTIFY_SECRET) answers arrive
+    # through /sheet_changed/, and the full sweep is only a safety net.
+    answers_interval = 900 if os.environ.get("MEABOT_NOTIFY_SECRET") else 60
+
+    # Each tenant gets its own answer and refresh jobs (and locks), so one slow
+    # or throttled spreadsheet does not hold up the others.
+    for source in get_sources().values():
+        async def dispatch_answers(source=source):
+            await reconcile_questions(await application_for_source(source), source)
+
+        def refresh_and_render(source):
+            refresh_sheet_caches(source)
+            # Detail screens of the new data are rendered before anyone opens them
+            for fetch in (fetch_student_discounts, fetch_exchange_opportunities, fetch_internships):
+                render.prerender(fetch(source=source))
+
+        async def refresh_snapshots(source=source):
+            await asyncio.to_thread(refresh_and_render, source)
+
+        async def prefetch_media(source=source):
+            records = []
+            for fetch in (fetch_student_discounts, fetch_exchange_opportunities, fetch_internships):
+                records.extend(await asyncio.to_thread(fetch, source=source))
+            bot_app = await application_for_source(source)
+            await media.prefetch_media(bot_app.bot, records)
+
+        register_job(f"answers:{source.key}", dispatch_answers, _interval_from_env("answers", answers_interval))
+        async def write_back(source=source):
+            await run_sheets_bound(push_sheet_changes, source)
+
+        register_job(f"refresh:{source.key}", refresh_snapshots, source.refresh_interval)
+        # New questions reach the sheet within seconds even when the answers
+        # sweep runs only every 15 minutes; answers given in the admin chat are
+        # already delivered and only batched into the sheet here.
+        register_job(f"writeback:{source.key}", write_back, _interval_from_env("writeback", 10))
+        if media.MEDIA_CACHE_CHAT_ID:
+            # Runs right behind the refresh so new images are uploaded before anyone opens them
+            register_job(f"media:{source.key}", prefetch_media, source.refresh_interval)
+        if faq.FAQ_ENABLED:
+            async def refresh_faq(source=source):
+                await asyncio.to_thread(faq.refresh_faq, source)
+
+            # Every worker searches its own in-memory index, so every worker refreshes it
+            register_job(f"faq:{source.key}", refresh_faq, faq.REFRESH_SECONDS, exclusive=False)
+
+    async def flush_metrics():
+        await asyncio.to_thread(metrics.flush)
+
+    async def flush_views():
+        await sync_to_async(analytics.flush)()
+
+    # Every worker buffers its own counters, so every worker has to flush.
+    register_job("metrics", flush_metrics, _interval_from_env("metrics", 60), exclusive=False)
+    register_job("analytics", flush_views, _interval_from_env("analytics", 60), exclusive=False)
+
+
+def start():
+    """
+    Starts all jobs as tasks on the running event loop. Safe to call more than
+    once; set MEABOT_SCHEDULER=0 to disable background jobs for a process.
+    """
+    if _tasks or os.environ.get("MEABOT_SCHEDULER", "1") == "0":
+        return
+    _register_default_jobs()
+    loop = asyncio.get_running_loop()
+    for job in _jobs.values():
+        _tasks.append(loop.create_task(_run_forever(job), name=f"meabot-job-{job.name}"))
+    logger.info("Scheduler started with jobs: %s", ", ".join(_jobs))
+
+
+async def stop():
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
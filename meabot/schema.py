@@ -0,0 +1,184 @@
+# meabot/schema.py
+
+import re
+import logging
+from functools import lru_cache
+from dataclasses import dataclass, field
+
+from .records import Exchange, Internship, Discount
+
+logger = logging.getLogger(__name__)
+
+
+# --------------------------
+# Normalizers
+# --------------------------
+def clean_text(value):
+    return str(value).strip() if value is not None else ""
+
+
+_ADDRESS_SEPARATORS = re.compile(r'\s*\n\s*|\s*\|\|\s*|\s*\|\s*|\s*;\s*')
+
+
+def split_addresses(addresses_raw: str):
+    """
+    Split addresses cell into list. Accepts newline, ||, |, ; as separators.
+    """
+    if not addresses_raw:
+        return []
+    # Normalize line breaks
+    parts = _ADDRESS_SEPARATORS.split(str(addresses_raw).strip())
+    result = [p.strip() for p in parts if p and p.strip()]
+    return result
+
+
+# Categories repeat on almost every row, so each distinct label is normalized once
+@lru_cache(maxsize=1024)
+def normalize_category(cat: str):
+    """
+    Normalize human-entered category to a canonical key:
+    e.g. "Coffee Shops" -> "coffee_shops"
+    """
+    if not cat:
+        return "uncategorized"
+    s = cat.strip().lower()
+    s = re.sub(r'&', 'and', s)
+    s = re.sub(r'[^a-z0-9]+', '_', s)
+    s = re.sub(r'_+', '_', s)
+    s = s.strip('_')
+    return s or "uncategorized"
+
+
+# --------------------------
+# Schema definitions
+# --------------------------
+@dataclass(frozen=True)
+class Column:
+    field: str
+    headers: tuple            # accepted header spellings, compared case-insensitively
+    normalize: object = clean_text
+    required: bool = False
+    source: str = None        # derive this field from another column's cell
+
+
+@dataclass(frozen=True)
+class SheetSchema:
+    kind: str
+    record: type
+    columns: tuple
+
+    @property
+    def sheet_fields(self):
+        """Fields that occupy a sheet column of their own, in default sheet order."""
+        return tuple(c.field for c in self.columns if c.source is None)
+
+
+@dataclass
+class ParseResult:
+    records: list = field(default_factory=list)
+    rejected: list = field(default_factory=list)  # (sheet row number, reason)
+
+
+# Optional image (logo / poster) URL column shared by all tabs
+MEDIA_HEADERS = ("media", "logo", "image", "poster")
+
+SCHEMAS = {
+    "exchanges": SheetSchema("exchanges", Exchange, (
+        Column("program_name", ("program name", "program"), required=True),
+        Column("partner_university", ("partner university", "university")),
+        Column("who_can_apply", ("who can apply", "eligibility")),
+        Column("start_reg", ("start of registration", "start reg", "registration start")),
+        Column("end_reg", ("end of registration", "end reg", "registration end")),
+        Column("duration", ("duration",)),
+        Column("website", ("website", "link")),
+        Column("media", MEDIA_HEADERS),
+    )),
+    "internships": SheetSchema("internships", Internship, (
+        Column("internship_program", ("internship program", "internship", "program"), required=True),
+        Column("field_department", ("field/department", "field", "department")),
+        Column("duration_details", ("duration & details", "duration", "details")),
+        Column("location", ("location",)),
+        Column("application_deadline", ("application deadline", "deadline")),
+        Column("application_link", ("application link", "link")),
+        Column("media", MEDIA_HEADERS),
+    )),
+    "discounts": SheetSchema("discounts", Discount, (
+        Column("organization", ("organization", "organisation", "name"), required=True),
+        Column("addresses", ("addresses", "address"), normalize=split_addresses),
+        Column("discount", ("discount",)),
+        Column("details", ("details",)),
+        Column("instagram", ("instagram",)),
+        Column("category", ("category",)),
+        Column("category_key", (), normalize=normalize_category, source="category"),
+        Column("media", MEDIA_HEADERS),
+    )),
+}
+
+
+def header_index(schema, header_row, overrides):
+    """
+    Maps each sheet field to the index of its header. Returns None when the
+    header row does not name every required column, so callers can fall back
+    to positional mapping.
+    """
+    positions = {clean_text(h).lower(): i for i, h in reversed(list(enumerate(header_row)))}
+    index = {}
+    for column in schema.columns:
+        if column.source is not None:
+            continue
+        names = (overrides.get(column.field),) if column.field in overrides else column.headers
+        for name in names:
+            if name and name.lower() in positions:
+                index[column.field] = positions[name.lower()]
+                break
+    if any(c.required and c.field not in index for c in schema.columns):
+        return None
+    return index
+
+
+def parse_rows(schema, values, order=None, headers=None, first_row=1):
+    """
+    Turns raw sheet values (header row first) into records in one columnar
+    pass: every column is extracted and normalized as a whole list, required
+    fields are checked per column, and only then are rows zipped into records.
+    `order` is the positional field order used when the header row does not
+    match; `headers` overrides the header text per field.
+    """
+    if not values:
+        return ParseResult()
+    header_row, body = values[0], values[1:]
+    index = header_index(schema, header_row, headers or {})
+    if index is None:
+        # No usable header row: read the data rows in the given column order
+        order = order or schema.sheet_fields
+        logger.warning("%s: header row %r not recognized, using positional columns", schema.kind, header_row)
+        index = {f: i for i, f in enumerate(order)}
+
+    count = len(body)
+    columns = {}
+    for column in schema.columns:
+        i = index.get(column.source or column.field)
+        if i is None:
+            raw = [""] * count
+        else:
+            raw = [row[i] if i < len(row) else "" for row in body]
+        columns[column.field] = list(map(column.normalize, raw))
+
+    reasons = [None] * count
+    for column in schema.columns:
+        if not column.required:
+            continue
+        for j, value in enumerate(columns[column.field]):
+            if not value and reasons[j] is None:
+                reasons[j] = f"missing {column.field}"
+
+    result = ParseResult()
+    from_row = schema.record.from_row
+    field_columns = [columns[c.field] for c in schema.columns]
+    for j, row in enumerate(zip(*field_columns)):
+        if reasons[j] is None:
+            result.records.append(from_row(row))
+        elif any(clean_text(cell) for cell in body[j]):
+            # Fully blank rows are just padding, not worth reporting
+            result.rejected.append((first_row + 1 + j, reasons[j]))
+    return result
@@ -1,35 +1,31 @@
 # meabot/telegram_handlers.py
 
 import logging
-import re
+import os
+import time
+import hashlib
+from collections import OrderedDict
 from telegram import (
     Update, InlineKeyboardButton, InlineKeyboardMarkup
 )
+from telegram.error import BadRequest, TelegramError
 from telegram.ext import (
     ContextTypes, CommandHandler, CallbackQueryHandler, MessageHandler, filters
 )
-from .google_sheets import fetch_exchange_opportunities, record_user_question, fetch_internships, fetch_student_discounts
-from django.core.cache import cache
+from .google_sheets import fetch_exchange_opportunities, fetch_internships, fetch_student_discounts
+from .questions import record_question, post_to_admin_chat, answer_from_admin_chat
+from .faq import suggest_answer
+from .analytics import record_view, rank, get_popularity, POPULAR_FIRST
+from .ratelimit import ask_limiter, nav_limiter
+from .tenants import QuotaExceeded, current_source, get_current_source, get_source, resolve_source
+from .render import render_details
+from . import media, metrics
 
 logger = logging.getLogger(__name__)
 
 # --------------------------
 # small helpers
 # --------------------------
-def normalize_category(cat: str):
-    """
-    Normalize human-entered category to a canonical key:
-    e.g. "Coffee Shops" -> "coffee_shops"
-    """
-    if not cat:
-        return "uncategorized"
-    s = cat.strip().lower()
-    s = re.sub(r'&', 'and', s)
-    s = re.sub(r'[^a-z0-9]+', '_', s)
-    s = re.sub(r'_+', '_', s)
-    s = s.strip('_')
-    return s or "uncategorized"
-
 # Emoji hints for some common keys
 CATEGORY_EMOJI = {
     "coffeeshops": "☕",
@@ -45,6 +41,128 @@ def back_button(callback_data: str, text: str="« Back"):
     """Helper function to build a 'Back' button with some emoji style."""
     return InlineKeyboardButton(text, callback_data=callback_data)
 
+
+# Fingerprint of the last text + markup rendered into each message, as a
+# bounded LRU so long-running workers do not grow without limit. It is per
+# worker: if another worker changed the message since this one rendered it,
+# a tap back to this worker's last screen is skipped until the next change.
+# Two bots can share a chat and message id, hence the bot id in the key.
+RENDERED_CACHE_SIZE = 5000
+_rendered = OrderedDict()
+
+
+def _render_fingerprint(text, reply_markup, kwargs):
+    markup = reply_markup.to_json() if reply_markup else ""
+    options = repr(sorted(kwargs.items()))
+    return hashlib.blake2b(f"{text}\0{markup}\0{options}".encode(), digest_size=16).digest()
+
+
+def _remember_render(key, fingerprint):
+    _rendered[key] = fingerprint
+    _rendered.move_to_end(key)
+    if len(_rendered) > RENDERED_CACHE_SIZE:
+        _rendered.popitem(last=False)
+
+
+async def edit_message(query, text, reply_markup=None, **kwargs):
+    """
+    query.edit_message_text() that skips the API call when the message already
+    shows exactly this content (re-tapping a category, "« Back" to an unchanged
+    screen). The callback itself is answered by inline_button_handler.
+    """
+    message = query.message
+    bot = query.get_bot()
+    key = (bot.id, message.chat_id, message.message_id) if message else (bot.id, query.inline_message_id)
+    fingerprint = _render_fingerprint(text, reply_markup, kwargs)
+    if _rendered.get(key) == fingerprint:
+        _rendered.move_to_end(key)
+        metrics.incr('edits_skipped')
+        return
+
+    if message is not None and message.photo:
+        # A photo detail screen cannot be edited into text, so replace it
+        new_message = await bot.send_message(
+            chat_id=message.chat_id, text=text, reply_markup=reply_markup, **kwargs
+        )
+        await message.delete()
+        _remember_render((bot.id, new_message.chat_id, new_message.message_id), fingerprint)
+        return
+
+    try:
+        await query.edit_message_text(text=text, reply_markup=reply_markup, **kwargs)
+    except BadRequest as e:
+        # Rendered before we started tracking it (e.g. after a restart)
+        if "message is not modified" not in str(e).lower():
+            raise
+        metrics.incr('edits_skipped')
+
+    _remember_render(key, fingerprint)
+
+
+async def show_details(query, rendered, reply_markup, media_url="", **kwargs):
+    """
+    Shows a pre-rendered detail screen (meabot/render.py). With an image the
+    menu message is replaced by the photo (sent by cached Telegram file_id)
+    with the details as caption; without one, or when the text is too long
+    for a caption, it is a normal edit. A message too long for Telegram
+    continues in follow-up messages, the last of which carries the buttons.
+    """
+    message = query.message
+    text, rest = rendered.parts[0], rendered.parts[1:]
+    kwargs["parse_mode"] = rendered.parse_mode
+    if media_url and message is not None and not rest and len(text) <= media.CAPTION_LIMIT:
+        options = {k: v for k, v in kwargs.items() if k != "disable_web_page_preview"}
+        try:
+            await media.send_photo(
+                message.get_bot(), message.chat_id, media_url,
+                caption=text, reply_markup=reply_markup, **options
+            )
+        except BadRequest as e:
+            logger.warning("Could not send media %s, showing text only: %s", media_url, e)
+        else:
+            # The details are shown already; a menu left behind beats sending them twice
+            try:
+                await message.delete()
+            except TelegramError as e:
+                logger.warning("Could not delete menu message %s: %s", message.message_id, e)
+            return
+    if not rest or message is None:
+        await edit_message(query, text=text, reply_markup=reply_markup, **kwargs)
+        return
+    await edit_message(query, text=text, **kwargs)
+    for i, part in enumerate(rest, 1):
+        await message.get_bot().send_message(
+            chat_id=message.chat_id, text=part,
+            reply_markup=reply_markup if i == len(rest) else None, **kwargs
+        )
+
+# --------------------------
+# Tenant routing (runs before every other handler)
+# --------------------------
+async def bind_tenant(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Selects the data source for this update. A deep link (/start <tenant>)
+    pins the chat to that tenant; otherwise the chat's pinned tenant, the
+    chat mapping or the bot token decide.
+    """
+    selected = None
+    message = update.message
+    if message and message.text and message.text.startswith("/start "):
+        param = message.text.split(maxsplit=1)[1].strip()
+        if get_source(param):
+            selected = param
+            if context.chat_data is not None:
+                context.chat_data["tenant"] = param
+    if not selected and context.chat_data is not None:
+        selected = context.chat_data.get("tenant")
+
+    chat = update.effective_chat
+    current_source.set(resolve_source(
+        chat_id=chat.id if chat else None,
+        bot_token=context.bot.token,
+        selected=selected,
+    ))
+
 # --------------------------
 # /start Handler
 # --------------------------
@@ -99,8 +217,8 @@ def _build_categories_map(discounts_list):
     """
     mapping = {}
     for idx, d in enumerate(discounts_list):
-        raw_cat = d.get('category') or "Uncategorized"
-        key = normalize_category(raw_cat)
+        raw_cat = d.category or "Uncategorized"
+        key = d.category_key
         mapping.setdefault(key, {"label": raw_cat.strip() or key.replace('_', ' ').title(), "indices": []})
         mapping[key]["indices"].append(idx)
     return mapping
@@ -123,6 +241,10 @@ def create_discounts_menu(category=None):
         keyboard = []
         # Order categories alphabetically by label (but keep uncategorized last)
         keys_sorted = sorted(categories_map.keys(), key=lambda k: (k == "uncategorized", categories_map[k]["label"].lower()))
+        if POPULAR_FIRST:
+            # Most viewed categories first; sort is stable, so ties stay alphabetical
+            views = get_popularity("discounts")
+            keys_sorted.sort(key=lambda k: -sum(views.get(discounts[i].organization, 0) for i in categories_map[k]["indices"]))
         for key in keys_sorted:
             label = categories_map[key]["label"]
             emoji = CATEGORY_EMOJI.get(key, "🎉")
@@ -140,11 +262,11 @@ def create_discounts_menu(category=None):
     # Show discounts for the requested category
     keyboard = []
     found = False
-    for idx, discount in enumerate(discounts):
-        if normalize_category(discount.get("category")) == category:
+    for idx, discount in rank("discounts", discounts, lambda d: d.organization):
+        if discount.category_key == category:
             found = True
             button = InlineKeyboardButton(
-                f"🏪 {discount['organization']}",
+                f"🏪 {discount.organization}",
                 callback_data=f"discount_{idx}"
             )
             keyboard.append([button])
@@ -192,16 +314,73 @@ async def list_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 # --------------------------
 # CallbackQuery Handler
 # --------------------------
+# Repeat taps on the same button of the same message within this window are
+# only acknowledged. Keys are (user_id, chat_id, message_id).
+CALLBACK_DEBOUNCE_SECONDS = float(os.environ.get('MEABOT_CALLBACK_DEBOUNCE', 1.0))
+# Coalescing is per worker: a tap that lands on another worker runs there
+# instead of collapsing, which costs an edit but is still rendered correctly.
+CALLBACK_HISTORY_SIZE = 5000
+_callbacks_in_flight = {}   # key -> latest query that arrived while one was running
+_last_callback = OrderedDict()  # key -> (data, finished_at)
+
+
+def _callback_key(query):
+    bot_id = query.get_bot().id
+    message = query.message
+    if message:
+        return (bot_id, query.from_user.id, message.chat_id, message.message_id)
+    return (bot_id, query.from_user.id, query.inline_message_id)
+
+
 async def inline_button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Acknowledges every tap at once, but runs at most one handler per user and
+    message at a time. Taps arriving meanwhile collapse into the latest one,
+    which runs when the current handler finishes; a repeat of the tap that
+    just ran is dropped.
+    """
     query = update.callback_query
+    if not nav_limiter.allow(query.from_user.id):
+        metrics.incr('callbacks_throttled')
+        await query.answer("⏳ Easy there! Please wait a moment before tapping again.")
+        return
     await query.answer()
+    key = _callback_key(query)
+
+    if key in _callbacks_in_flight:
+        _callbacks_in_flight[key] = query
+        metrics.incr('callbacks_coalesced')
+        return
+    last = _last_callback.get(key)
+    if last and last[0] == query.data and time.monotonic() - last[1] < CALLBACK_DEBOUNCE_SECONDS:
+        metrics.incr('callbacks_debounced')
+        return
+
+    _callbacks_in_flight[key] = None
+    try:
+        while query is not None:
+            await _route_callback(query, context)
+            _last_callback[key] = (query.data, time.monotonic())
+            _last_callback.move_to_end(key)
+            if len(_last_callback) > CALLBACK_HISTORY_SIZE:
+                _last_callback.popitem(last=False)
+            query, _callbacks_in_flight[key] = _callbacks_in_flight[key], None
+            if query is not None and query.data == _last_callback[key][0]:
+                # The collapsed intent is what we just rendered
+                break
+    finally:
+        _callbacks_in_flight.pop(key, None)
+
+
+async def _route_callback(query, context) -> None:
     data = query.data
 
     # Add category handlers
     if data.startswith("category_"):
         category = data.split("_", 1)[1]
         text, keyboard = create_discounts_menu(category)
-        await query.edit_message_text(
+        await edit_message(
+            query,
             text=text,
             parse_mode="Markdown",
             reply_markup=InlineKeyboardMarkup(keyboard)
@@ -231,19 +410,30 @@ async def inline_button_handler(update: Update, context: ContextTypes.DEFAULT_TY
     # Update back button handler
     elif data == "go_back_to_discounts":
         text, keyboard = create_discounts_menu()
-        await query.edit_message_text(
+        await edit_message(
+            query,
             text=text,
             parse_mode="Markdown",
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
 
+    # FAQ reply did not help: hand the original question to the team
+    elif data == "faq_escalate":
+        await query.edit_message_reply_markup(reply_markup=None)
+        question_text = context.user_data.pop("faq_question", None)
+        if question_text is None:
+            await query.message.reply_text("Please send your question again with /ask.")
+            return
+        metrics.incr('faq_escalations')
+        await submit_question(query.message, context, query.from_user, question_text)
+
     # Existing navigation handlers
     elif data == "go_back_to_list":
         await go_back_to_list(query)
     elif data.startswith("go_back_to_exchange_list"):
         await show_exchanges(query, context)
     else:
-        await query.edit_message_text("❓ Unknown action. Please go back or try again.")
+        await edit_message(query, "❓ Unknown action. Please go back or try again.")
 
 
 async def show_discount_details(query, context, index):
@@ -254,38 +444,16 @@ async def show_discount_details(query, context, index):
     if index < 0 or index >= len(discounts):
         return
     discount = discounts[index]
-
-    details_text = (
-        f"🏢 *{discount['organization']}*\n\n"
-        f"💰 *Discount:* `{discount['discount']}`\n\n"
-        "📌 *Addresses:*\n"
-    )
-
-    # Add all addresses
-    for address in discount.get('addresses', []):
-        details_text += f"➖ {address}\n"
-
-    if discount.get('details'):
-        details_text += f"\n📝 *Details:*\n{discount['details']}\n\n"
-        
-    instagram = discount.get('instagram')
-    if instagram:
-        if instagram.startswith('@'):
-            user = instagram[1:]
-            formatted_ig = f"[@{user}](https://www.instagram.com/{user}/)"
-        else:
-            formatted_ig = instagram
-        details_text += f"\n📱 *Instagram:* {formatted_ig}\n\n"
-
-    details_text += "_Show student ID to claim!_\n"
+    record_view("discounts", discount.organization)
 
     keyboard = [
         [back_button("go_back_to_discounts", "« Back to Discounts")]
     ]
 
-    await query.edit_message_text(
-        text=details_text,
-        parse_mode="Markdown",
+    await show_details(
+        query,
+        render_details(discount),
+        media_url=discount.media,
         reply_markup=InlineKeyboardMarkup(keyboard),
         disable_web_page_preview=True
     )
@@ -296,14 +464,15 @@ async def show_exchanges(query, context):
     """
     exchanges = fetch_exchange_opportunities()
     if not exchanges:
-        await query.edit_message_text(
+        await edit_message(
+            query,
             text="🚫 No Exchange Opportunities found. Check back soon!"
         )
         return
 
     keyboard = []
-    for idx, item in enumerate(exchanges):
-        program_name = item['program_name']
+    for idx, item in rank("exchanges", exchanges, lambda e: e.program_name):
+        program_name = item.program_name
         button = InlineKeyboardButton(
             f"🌍 {program_name}",
             callback_data=f"exchange_{idx}"
@@ -317,7 +486,8 @@ async def show_exchanges(query, context):
         "🌍 *Exchange Opportunities:*\n\n"
         "Below are the available programs. Tap one for more details!\n"
     )
-    await query.edit_message_text(
+    await edit_message(
+        query,
         text=text,
         parse_mode="Markdown",
         reply_markup=InlineKeyboardMarkup(keyboard)
@@ -330,32 +500,20 @@ async def show_exchange_details(query, context, index):
     """
     exchanges = fetch_exchange_opportunities()
     if index < 0 or index >= len(exchanges):
-        await query.edit_message_text("⚠️ Invalid exchange index.")
+        await edit_message(query, "⚠️ Invalid exchange index.")
         return
 
     opp = exchanges[index]
-
-    # Format registration period with calendar emoji
-    registration_period = f"{opp['start_reg']}  →  {opp['end_reg']}"
-
-    details_text = (
-        f"🎓 *{opp['program_name']}*\n\n"
-        "🌟 *Program Details:*\n\n"
-        f"🏛️ *Partner University:*\n`{opp['partner_university']}`\n\n"
-        f"🎯 *Eligibility:*\n`{opp['who_can_apply']}`\n\n"
-        f"🗓️ *Registration Period:*\n`{registration_period}`\n\n"
-        f"⏳ *Program Duration:*\n`{opp['duration']}`\n\n"
-        f"🌐 *Official Website:* [Visit Site]({opp['website']})\n\n"
-        "_Need more info? Use_ /ask _to contact us!_ 💬"
-    )
+    record_view("exchanges", opp.program_name)
 
     keyboard = [
         [back_button("go_back_to_exchange_list", "« Back to Exchanges List")]
     ]
 
-    await query.edit_message_text(
-        text=details_text,
-        parse_mode="Markdown",
+    await show_details(
+        query,
+        render_details(opp),
+        media_url=opp.media,
         reply_markup=InlineKeyboardMarkup(keyboard),
         disable_web_page_preview=True  # Disable link preview for cleaner look
     )
@@ -376,7 +534,8 @@ async def go_back_to_list(query):
         "3) Student Discounts 🎉\n\n"
         "Select one below!"
     )
-    await query.edit_message_text(
+    await edit_message(
+        query,
         text=text,
         parse_mode="Markdown",
         reply_markup=InlineKeyboardMarkup(keyboard)
@@ -386,7 +545,8 @@ async def show_internships(query, context):
     """Displays the list of internship programs"""
     internships = fetch_internships()
     if not internships:
-        await query.edit_message_text(
+        await edit_message(
+            query,
             text="💼 No internship opportunities available at the moment. Check back later!",
             reply_markup=InlineKeyboardMarkup([
                 [back_button("go_back_to_list", "« Back to Categories")]
@@ -395,9 +555,9 @@ async def show_internships(query, context):
         return
 
     keyboard = []
-    for idx, internship in enumerate(internships):
+    for idx, internship in rank("internships", internships, lambda i: i.internship_program):
         button = InlineKeyboardButton(
-            f"💼 {internship['internship_program']}",
+            f"💼 {internship.internship_program}",
             callback_data=f"internship_{idx}"
         )
         keyboard.append([button])
@@ -410,7 +570,8 @@ async def show_internships(query, context):
         "━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
     )
     
-    await query.edit_message_text(
+    await edit_message(
+        query,
         text=text,
         parse_mode="Markdown",
         reply_markup=InlineKeyboardMarkup(keyboard)
@@ -420,28 +581,20 @@ async def show_internship_details(query, context, index):
     """Shows detailed information about a specific internship"""
     internships = fetch_internships()
     if index < 0 or index >= len(internships):
-        await query.edit_message_text("⚠️ Invalid internship selection.")
+        await edit_message(query, "⚠️ Invalid internship selection.")
         return
 
     internship = internships[index]
-
-    details_text = (
-        f"🏢 *{internship['internship_program']}*\n\n"
-        f"📚 *Field/Department:* {internship['field_department']}\n\n"
-        f"⏳ *Duration & Details:*\n{internship['duration_details']}\n\n"
-        f"📍 *Location:* {internship['location']}\n\n"
-        f"📅 *Application Deadline:* {internship['application_deadline']}\n\n"
-        f"🔗 *Application Link:* [Apply Here]({internship['application_link']})\n\n"
-        "_Need more info? Use_ /ask _to contact us!_ 💬"
-    )
+    record_view("internships", internship.internship_program)
 
     keyboard = [
         [back_button("go_back_to_internships_list", "« Back to Internships")]
     ]
 
-    await query.edit_message_text(
-        text=details_text,
-        parse_mode="Markdown",
+    await show_details(
+        query,
+        render_details(internship),
+        media_url=internship.media,
         reply_markup=InlineKeyboardMarkup(keyboard),
         disable_web_page_preview=True
     )
@@ -464,23 +617,59 @@ async def ask_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
 # --------------------------
 # Message Handler (next text)
 # --------------------------
+async def submit_question(message, context, user, question_text) -> None:
+    """
+    Records a question for the team (rate limited) and confirms it with a
+    reply to `message`. Used for /ask and for FAQ escalations.
+    """
+    if not ask_limiter.allow(user.id):
+        metrics.incr('questions_throttled')
+        await message.reply_text(
+            "⏳ *Thanks for your enthusiasm!*\n\n"
+            "You've sent several questions in a short time. "
+            "Please wait a little before asking again — we'll answer the ones we have first. 🙏",
+            parse_mode="Markdown"
+        )
+        return
+
+    # Saved locally; the scheduler mirrors it to the Questions sheet
+    source = get_current_source()
+    question = await record_question(user.id, user.username or "N/A", question_text, source)
+
+    await message.reply_text(
+        "✅ *Question Recorded!*\n\n"
+        "Thanks for your submission. We'll review and respond soon. ✨\n",
+        parse_mode="Markdown"
+    )
+    await post_to_admin_chat(context.bot, question, source)
+
+
 async def message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Catches text messages that are not commands
     """
     if context.user_data.get("awaiting_question"):
         question_text = update.message.text
-        user_id = update.effective_user.id
-        username = update.effective_user.username or "N/A"
+        context.user_data["awaiting_question"] = False
 
-        record_user_question(user_id, username, question_text)
+        # Questions answered before (or covered by the sheet) get an instant
+        # reply; the user can still pass the question on to the team.
+        match = await suggest_answer(get_current_source(), question_text)
+        if match is not None:
+            metrics.incr('faq_answers')
+            context.user_data["faq_question"] = question_text
+            await update.message.reply_text(
+                "💡 This might answer your question:\n\n"
+                f"{match.entry.answer}\n\n"
+                "Not what you needed? Tap below and our team will answer you.",
+                reply_markup=InlineKeyboardMarkup(
+                    [[InlineKeyboardButton("🙋 Ask a human", callback_data="faq_escalate")]]
+                ),
+                disable_web_page_preview=True
+            )
+            return
 
-        await update.message.reply_text(
-            "✅ *Question Recorded!*\n\n"
-            "Thanks for your submission. We'll review and respond soon. ✨\n",
-            parse_mode="Markdown"
-        )
-        context.user_data["awaiting_question"] = False
+        await submit_question(update.message, context, update.effective_user, question_text)
     else:
         await update.message.reply_text(
             "🤔 Not sure what you meant. Try these commands:\n"
@@ -490,18 +679,52 @@ async def message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             "• /ask - Ask a question"
         )
 
+# --------------------------
+# Admin chat replies
+# --------------------------
+async def admin_reply_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Messages in an admin chat. A reply to a posted question is sent to the
+    asker as the answer; everything else is ordinary chatter and ignored.
+    """
+    message = update.message
+    if not message or not message.text or not message.reply_to_message:
+        return
+    try:
+        question = await answer_from_admin_chat(
+            context.bot, message.chat_id, message.reply_to_message.message_id, message.text
+        )
+    except Exception:
+        await message.reply_text("⚠️ Could not deliver the answer; it will be retried automatically.")
+        return
+    if question is None:
+        if message.reply_to_message.from_user and message.reply_to_message.from_user.id == context.bot.id:
+            await message.reply_text("ℹ️ This question was already answered.")
+        return
+    await message.reply_text(f"✅ Answer sent to question #{question.id}.")
+
+async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Asks the user to retry when their tenant ran out of Sheets reads and no
+    earlier snapshot could be served; any other error is only logged.
+    """
+    if not isinstance(context.error, QuotaExceeded):
+        logger.error("Error while handling an update", exc_info=context.error)
+        return
+    metrics.incr('quota_exceeded_replies')
+    chat = update.effective_chat if isinstance(update, Update) else None
+    if chat is not None:
+        await context.bot.send_message(
+            chat_id=chat.id,
+            text="⏳ We're getting a lot of requests right now. Please try again in a minute.",
+        )
+
 def get_student_discounts():
     """
     Returns cached student discounts, fetching from Google Sheets if not cached.
     """
-    cached = cache.get('student_discounts')
-    if cached:
-        return cached
     try:
-        discounts = fetch_student_discounts()
+        return fetch_student_discounts()
     except Exception as e:
         logger.error(f"Failed to fetch student discounts from sheet: {e}")
-        discounts = []
-    # ensure cache is set even when fetch failed (so we don't hammer sheet)
-    cache.set('student_discounts', discounts, 3600)
-    return discounts
+        return []
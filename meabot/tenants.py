@@ -0,0 +1,158 @@
+# meabot/tenants.py
+
+import os
+import json
+import time
+import logging
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from django.core.cache import cache
+
+from .schema import SCHEMAS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TENANT = "default"
+
+DEFAULT_TABS = {
+    "exchanges": "Exchanges",
+    "internships": "Internships",
+    "discounts": "Discounts",
+    "questions": "Questions",
+}
+
+
+class QuotaExceeded(Exception):
+    """Raised when a tenant has used up its Sheets read budget for the minute."""
+
+
+def _default_columns():
+    # Positional column order per tab, as record field names. Only used when a
+    # tab's header row cannot be matched against the schema (meabot/schema.py).
+    return {kind: schema.sheet_fields for kind, schema in SCHEMAS.items()}
+
+
+@dataclass(frozen=True)
+class DataSource:
+    key: str
+    spreadsheet_id: str
+    tabs: dict = field(default_factory=lambda: dict(DEFAULT_TABS))
+    columns: dict = field(default_factory=_default_columns)
+    headers: dict = field(default_factory=dict)  # kind -> {field: header text}
+    bot_token: str = ""
+    chat_ids: tuple = ()
+    admin_chat_id: int = 0  # chat receiving new questions; replies there are answers
+    cache_ttl: int = 900
+    refresh_interval: float = 600
+    reads_per_minute: int = 60
+
+    def cache_key(self, name):
+        return f"{self.key}:{name}"
+
+    def range_for(self, kind):
+        """Range of the tab holding `kind`; data tabs include their header row."""
+        if kind == "questions":
+            return f"{self.tabs['questions']}!A2:G"
+        return f"{self.tabs[kind]}!A1:Z"
+
+    def consume_read_quota(self):
+        window = int(time.time() // 60)
+        key = f"sheets_quota:{self.key}:{window}"
+        cache.add(key, 0, 120)
+        try:
+            used = cache.incr(key)
+        except ValueError:
+            return
+        if used > self.reads_per_minute:
+            raise QuotaExceeded(f"Tenant {self.key} exceeded {self.reads_per_minute} Sheets reads/minute")
+
+
+def _source_from_config(config):
+    config = dict(config)
+    tabs = dict(DEFAULT_TABS)
+    tabs.update(config.pop("tabs", {}))
+    columns = _default_columns()
+    columns.update({kind: tuple(cols) for kind, cols in config.pop("columns", {}).items()})
+    chat_ids = tuple(int(c) for c in config.pop("chat_ids", ()))
+    admin_chat_id = int(config.pop("admin_chat_id", 0))
+    return DataSource(tabs=tabs, columns=columns, chat_ids=chat_ids, admin_chat_id=admin_chat_id, **config)
+
+
+def _load_sources():
+    """
+    Tenants come from MEABOT_TENANTS (a JSON list) or the JSON file named by
+    MEABOT_TENANTS_FILE. Each entry needs a "key" and a "spreadsheet_id" and may
+    override tabs, columns, headers, bot_token, chat_ids, admin_chat_id, cache_ttl,
+    refresh_interval and reads_per_minute. Without configuration the original spreadsheet is
+    served as the single "default" tenant.
+    """
+    from .google_sheets import SPREADSHEET_ID, SHEETS_CACHE_TTL
+
+    raw = os.environ.get("MEABOT_TENANTS")
+    path = os.environ.get("MEABOT_TENANTS_FILE")
+    if not raw and path:
+        with open(path, encoding="utf-8") as f:
+            raw = f.read()
+    configs = json.loads(raw) if raw else []
+
+    sources = {}
+    for config in configs:
+        source = _source_from_config(config)
+        sources[source.key] = source
+    if DEFAULT_TENANT not in sources:
+        sources[DEFAULT_TENANT] = DataSource(
+            key=DEFAULT_TENANT,
+            spreadsheet_id=SPREADSHEET_ID,
+            bot_token=os.environ.get("TELEGRAM_BOT_TOKEN", ""),
+            admin_chat_id=int(os.environ.get("MEABOT_ADMIN_CHAT_ID", 0)),
+            cache_ttl=SHEETS_CACHE_TTL,
+            refresh_interval=float(os.environ.get("MEABOT_REFRESH_INTERVAL", 600)),
+        )
+    return sources
+
+
+_sources = None
+
+
+def get_sources():
+    global _sources
+    if _sources is None:
+        _sources = _load_sources()
+        logger.info("Loaded %d data source(s): %s", len(_sources), ", ".join(_sources))
+    return _sources
+
+
+def get_source(key):
+    return get_sources().get(key)
+
+
+def get_default_source():
+    return get_sources()[DEFAULT_TENANT]
+
+
+# The data source of the update being handled; set by bind_tenant() in
+# telegram_handlers before any other handler runs.
+current_source = ContextVar("current_source", default=None)
+
+
+def get_current_source():
+    return current_source.get() or get_default_source()
+
+
+def resolve_source(chat_id=None, bot_token=None, selected=None):
+    """
+    Picks the tenant for an update: an explicit (deep-link) selection first,
+    then a chat bound to a tenant, then the tenant owning the bot token.
+    """
+    sources = get_sources()
+    if selected and selected in sources:
+        return sources[selected]
+    if chat_id is not None:
+        for source in sources.values():
+            if chat_id in source.chat_ids or chat_id == source.admin_chat_id:
+                return source
+    if bot_token:
+        for source in sources.values():
+            if source.bot_token and source.bot_token == bot_token:
+                return source
+    return sources[DEFAULT_TENANT]
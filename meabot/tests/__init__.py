@@ -0,0 +1,6 @@
+import os
+
+# The system checks import the URLconf and with it meabot.bot, which needs a
+# token to build the application; tests never talk to Telegram.
+os.environ.setdefault('TELEGRAM_BOT_TOKEN', '1:test')
+os.environ.setdefault('MEABOT_SCHEDULER', '0')
@@ -0,0 +1,76 @@
+import re
+
+_CELL = re.compile(r"([A-Z]+)(\d*)")
+
+
+def _cell(a1):
+    match = _CELL.match(a1)
+    return ord(match.group(1)) - ord("A"), int(match.group(2)) if match.group(2) else None
+
+
+class _Request:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+
+class FakeSheet:
+    """
+    One tab of a spreadsheet behind the subset of the Sheets values API the
+    bot uses (get, batchGet, append, batchUpdate). Rows are 1-based lists and
+    values come back as strings, like FORMATTED_VALUE reads.
+    """
+
+    def __init__(self, rows):
+        self.rows = {n: list(row) for n, row in enumerate(rows, 1)}
+        self.calls = []
+
+    # service.spreadsheets().values() chain
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def _read(self, a1_range):
+        start, _, end = a1_range.split("!")[1].partition(":")
+        first_col, first_row = _cell(start)
+        last_col, last_row = _cell(end or start)
+        last_row = last_row or max(self.rows, default=0)
+        values = []
+        for n in range(first_row, last_row + 1):
+            row = [str(v) for v in self.rows.get(n, [])[first_col:last_col + 1]]
+            while row and row[-1] == "":
+                row.pop()
+            values.append(row)
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def get(self, spreadsheetId, range):
+        self.calls.append("get")
+        return _Request({"values": self._read(range)})
+
+    def batchGet(self, spreadsheetId, ranges):
+        self.calls.append("batchGet")
+        return _Request({"valueRanges": [{"values": self._read(r)} for r in ranges]})
+
+    def append(self, spreadsheetId, range, valueInputOption, body):
+        self.calls.append("append")
+        first = max(self.rows, default=0) + 1
+        for offset, row in enumerate(body["values"]):
+            self.rows[first + offset] = list(row)
+        last = first + len(body["values"]) - 1
+        return _Request({"updates": {"updatedRange": f"{range.split('!')[0]}!A{first}:G{last}"}})
+
+    def batchUpdate(self, spreadsheetId, body):
+        self.calls.append("batchUpdate")
+        for data in body["data"]:
+            col, n = _cell(data["range"].split("!")[1].partition(":")[0])
+            row = self.rows.setdefault(n, [])
+            for offset, value in enumerate(data["values"][0]):
+                row.extend([""] * (col + offset + 1 - len(row)))
+                row[col + offset] = value
+        return _Request({})
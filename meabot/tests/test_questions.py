@@ -0,0 +1,138 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from meabot import google_sheets
+from meabot.models import Question
+from meabot.questions import SHEET_CLAIM_TIMEOUT, pull_answers, pull_rows, push_new_questions, push_sent_flags
+from meabot.tenants import DataSource
+
+from .fakesheets import FakeSheet
+
+HEADER = ["Timestamp", "UserID", "Username", "Question", "Answer", "Sent", "ID"]
+
+
+class QuestionSyncTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.source = DataSource(key="default", spreadsheet_id="test-sheet")
+        self.sheet = FakeSheet([HEADER])
+        patcher = mock.patch.object(google_sheets, "get_sheets_service", lambda: self.sheet)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def ask(self, user_id, text, **fields):
+        return Question.objects.create(tenant="default", user_id=user_id, username=f"u{user_id}",
+                                       question=text, **fields)
+
+    def test_push_appends_rows_with_their_ids(self):
+        first, second = self.ask(1, "When?"), self.ask(2, "Where?")
+        self.assertEqual(push_new_questions(self.source), 2)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.sheet_row, second.sheet_row), (2, 3))
+        self.assertEqual(self.sheet.rows[2][1:], [1, "u1", "When?", "", "", first.id])
+        self.assertEqual(self.sheet.rows[3][6], second.id)
+        self.assertEqual(first.sheet_claim, "")
+        # Nothing left to push
+        self.assertEqual(push_new_questions(self.source), 0)
+        self.assertEqual(self.sheet.calls.count("append"), 1)
+
+    def test_push_skips_questions_claimed_by_another_worker(self):
+        q = self.ask(1, "When?")
+        Question.objects.filter(id=q.id).update(sheet_claim="other", sheet_claimed_at=q.created_at)
+        self.assertEqual(push_new_questions(self.source), 0)
+        self.assertNotIn("append", self.sheet.calls)
+
+    def test_push_takes_over_stale_claims(self):
+        q = self.ask(1, "When?")
+        Question.objects.filter(id=q.id).update(
+            sheet_claim="dead", sheet_claimed_at=q.created_at - 2 * SHEET_CLAIM_TIMEOUT
+        )
+        self.assertEqual(push_new_questions(self.source), 1)
+
+    def test_push_releases_the_claim_when_the_append_fails(self):
+        q = self.ask(1, "When?")
+        with mock.patch.object(self.sheet, "append", side_effect=OSError("offline")):
+            with self.assertRaises(OSError):
+                push_new_questions(self.source)
+        q.refresh_from_db()
+        self.assertEqual((q.sheet_row, q.sheet_claim, q.sheet_claimed_at), (None, "", None))
+
+    def test_pull_picks_up_answers_by_id_after_rows_are_sorted(self):
+        first, second = self.ask(1, "When?"), self.ask(2, "Where?")
+        push_new_questions(self.source)
+        self.sheet.rows[2], self.sheet.rows[3] = self.sheet.rows[3], self.sheet.rows[2]
+        self.sheet.rows[3][4] = "Tomorrow"
+
+        pull_answers(self.source)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.sheet_row, first.answer, first.status), (3, "Tomorrow", Question.ANSWERED))
+        self.assertEqual((second.sheet_row, second.answer, second.status), (2, "", Question.PENDING))
+
+    def test_pull_marks_sent_rows(self):
+        q = self.ask(1, "When?", answer="Now", status=Question.ANSWERED, sheet_row=2)
+        self.sheet.rows[2] = ["t", "1", "u1", "When?", "Now", "yes", str(q.id)]
+        pull_rows(self.source, [2])
+        q.refresh_from_db()
+        self.assertEqual(q.status, Question.SENT)
+
+    def test_pull_imports_hand_added_rows_and_writes_their_ids(self):
+        self.sheet.rows[2] = ["t", "5", "staff", "Added by hand", "Done", ""]
+        self.sheet.rows[3] = ["t", "not a user", "", "Notes", "", ""]
+        self.assertEqual(pull_answers(self.source), 1)
+        q = Question.objects.get()
+        self.assertEqual((q.user_id, q.sheet_row, q.status), (5, 2, Question.ANSWERED))
+        self.assertEqual(self.sheet.rows[2][6], q.id)
+
+    def test_pull_keys_legacy_rows_that_still_match(self):
+        q = self.ask(1, "When?", sheet_row=2)
+        self.sheet.rows[2] = ["t", "1", "u1", "When?", "Soon", ""]
+        pull_answers(self.source)
+        q.refresh_from_db()
+        self.assertEqual(q.answer, "Soon")
+        self.assertEqual(self.sheet.rows[2][6], q.id)
+
+    def test_pull_skips_legacy_rows_holding_another_question(self):
+        q = self.ask(1, "When?", sheet_row=2)
+        self.sheet.rows[2] = ["t", "2", "u2", "Something else", "Answer for u2", ""]
+        self.assertEqual(pull_answers(self.source), 0)
+        q.refresh_from_db()
+        self.assertEqual((q.answer, q.status), ("", Question.PENDING))
+        self.assertEqual(Question.objects.count(), 1)
+        self.assertNotIn("batchUpdate", self.sheet.calls)
+
+    def test_pull_skips_unknown_and_repeated_ids(self):
+        q = self.ask(1, "When?", sheet_row=2)
+        self.sheet.rows[2] = ["t", "1", "u1", "When?", "A", "", str(q.id)]
+        self.sheet.rows[3] = ["t", "1", "u1", "When?", "B", "", str(q.id)]
+        self.sheet.rows[4] = ["t", "3", "u3", "Gone", "C", "", "999999"]
+        pull_answers(self.source)
+        q.refresh_from_db()
+        self.assertEqual((q.answer, q.sheet_row), ("A", 2))
+        self.assertEqual(Question.objects.count(), 1)
+
+    def test_push_sent_flags_writes_only_the_sent_flag_for_sheet_answers(self):
+        q = self.ask(1, "When?", answer="Now", status=Question.SENT, sheet_row=2, sheet_dirty=True)
+        self.sheet.rows[2] = ["t", "1", "u1", "When?", "Now (edited)", "", str(q.id)]
+        self.assertEqual(push_sent_flags(self.source), 1)
+        self.assertEqual(self.sheet.rows[2][4:6], ["Now (edited)", "yes"])
+        q.refresh_from_db()
+        self.assertFalse(q.sheet_dirty)
+
+    def test_push_sent_flags_writes_admin_chat_answers(self):
+        self.ask(1, "When?", answer="From chat", status=Question.SENT, sheet_row=2,
+                 sheet_dirty=True, answer_dirty=True)
+        self.sheet.rows[2] = ["t", "1", "u1", "When?", "", ""]
+        push_sent_flags(self.source)
+        self.assertEqual(self.sheet.rows[2][4:6], ["From chat", "yes"])
+
+    def test_push_sent_flags_defers_moved_rows(self):
+        q = self.ask(1, "When?", answer="Now", status=Question.SENT, sheet_row=2, sheet_dirty=True)
+        self.sheet.rows[2] = ["t", "2", "u2", "Other", "", "", str(q.id + 1)]
+        self.assertEqual(push_sent_flags(self.source), 0)
+        self.assertEqual(self.sheet.rows[2][5], "")
+        q.refresh_from_db()
+        self.assertTrue(q.sheet_dirty)
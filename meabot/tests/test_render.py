@@ -0,0 +1,97 @@
+import random
+from html.parser import HTMLParser
+from django.test import SimpleTestCase
+
+from meabot.render import split_message, telegram_length, escape, _TAG
+
+
+class _Balance(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.stack, self.ok = [], True
+
+    def handle_starttag(self, tag, attrs):
+        self.stack.append(tag)
+
+    def handle_endtag(self, tag):
+        if not self.stack or self.stack.pop() != tag:
+            self.ok = False
+
+
+def _balanced(part):
+    parser = _Balance()
+    parser.feed(part)
+    parser.close()
+    return parser.ok and not parser.stack
+
+
+def _plain(text):
+    return _TAG.sub("", text).replace("\n", "")
+
+
+class SplitMessageTests(SimpleTestCase):
+    def test_short_message_is_one_part(self):
+        self.assertEqual(split_message("<b>hi</b>"), ("<b>hi</b>",))
+
+    def test_long_line_is_cut_at_spaces_without_new_line_breaks(self):
+        text = "word " * 1000
+        parts = split_message(text)
+        self.assertGreater(len(parts), 1)
+        self.assertEqual("".join(parts), text)
+        for part in parts:
+            self.assertNotIn("\n", part)
+            self.assertTrue(part.startswith("word "))
+
+    def test_splits_at_line_breaks(self):
+        lines = [f"line {i} " + "x" * 50 for i in range(200)]
+        parts = split_message("\n".join(lines), limit=1000)
+        self.assertEqual([line for part in parts for line in part.split("\n")], lines)
+
+    def test_open_tags_are_closed_and_reopened(self):
+        text = "<code>" + "\n".join(["cell " * 20] * 30) + "</code>"
+        parts = split_message(text, limit=500)
+        self.assertGreater(len(parts), 1)
+        for part in parts:
+            self.assertTrue(part.startswith("<code>"), part[:20])
+            self.assertTrue(part.endswith("</code>"), part[-20:])
+            self.assertTrue(_balanced(part))
+
+    def test_entities_and_tags_are_never_cut(self):
+        text = " ".join([escape("a&b <c>"), '<a href="https://example.com/x">link</a>'] * 400)
+        for part in split_message(text, limit=300):
+            self.assertTrue(_balanced(part))
+            self.assertNotRegex(part, r"&[a-z]*$")
+
+    def test_counts_utf16_units(self):
+        text = "😀 " * 3000
+        for part in split_message(text):
+            self.assertLessEqual(telegram_length(part), 4096)
+        self.assertEqual(_plain("".join(split_message(text))), _plain(text))
+
+    def test_random_messages(self):
+        rng = random.Random(1)
+        words = ["alpha", "béta", "😀😀", "<x>", "a&b", '"q"', "naïve"]
+
+        def words_of(n):
+            return " ".join(rng.choice(words) for _ in range(n))
+
+        for _ in range(200):
+            limit = rng.choice([200, 400, 1000, 4096])
+            lines = []
+            for _ in range(rng.randint(5, 60)):
+                kind = rng.random()
+                if kind < .3:
+                    lines.append(f"<code>{escape(words_of(rng.randint(1, 300)))}</code>")
+                elif kind < .4:
+                    lines += [f"<code>{escape(words_of(20))}", f"{escape(words_of(30))}</code>"]
+                elif kind < .5:
+                    lines.append(f'<b>{escape(words_of(3))}</b> <a href="https://x.y/{"z" * rng.randint(1, 40)}">'
+                                 f'{escape(words_of(2))}</a>')
+                else:
+                    lines.append(escape(words_of(rng.randint(0, 400))))
+            text = "\n".join(lines)
+            parts = split_message(text, limit)
+            for part in parts:
+                self.assertLessEqual(telegram_length(part), limit)
+                self.assertTrue(_balanced(part), part)
+            self.assertEqual("".join(_plain(p) for p in parts), _plain(text))
@@ -0,0 +1,48 @@
+from django.test import SimpleTestCase
+
+from meabot.schema import SCHEMAS, header_index, parse_rows
+
+
+class ParseRowsTests(SimpleTestCase):
+    schema = SCHEMAS["discounts"]
+
+    def test_maps_columns_by_header_aliases(self):
+        result = parse_rows(self.schema, [
+            ["Category", "Discount", "Organisation", "Address"],
+            ["Coffee Shops", "10%", " Kofe ", "Main st 1 | Side st 2"],
+        ])
+        self.assertEqual(result.rejected, [])
+        [record] = result.records
+        self.assertEqual(record.organization, "Kofe")
+        self.assertEqual(record.addresses, ("Main st 1", "Side st 2"))
+        self.assertEqual(record.discount, "10%")
+        self.assertEqual(record.category_key, "coffee_shops")
+
+    def test_header_overrides(self):
+        index = header_index(self.schema, ["Partner", "Deal"], {"organization": "Partner", "discount": "Deal"})
+        self.assertEqual(index, {"organization": 0, "discount": 1})
+
+    def test_positional_fallback_skips_the_header_row(self):
+        result = parse_rows(self.schema, [
+            ["Who", "Where", "How much"],
+            ["Kofe", "Main st 1", "10%"],
+        ])
+        self.assertEqual([r.organization for r in result.records], ["Kofe"])
+        self.assertEqual(result.records[0].discount, "10%")
+
+    def test_positional_fallback_uses_the_given_order(self):
+        result = parse_rows(self.schema, [["x", "y"], ["10%", "Kofe"]], order=("discount", "organization"))
+        self.assertEqual((result.records[0].organization, result.records[0].discount), ("Kofe", "10%"))
+
+    def test_rows_without_required_fields_are_rejected(self):
+        result = parse_rows(self.schema, [
+            ["Organization", "Discount"],
+            ["Kofe", "10%"],
+            ["", "5%"],
+            ["Shop", ""],
+        ], first_row=1)
+        self.assertEqual([r.organization for r in result.records], ["Kofe", "Shop"])
+        self.assertEqual([row for row, _ in result.rejected], [3])
+
+    def test_empty_sheet(self):
+        self.assertEqual(parse_rows(self.schema, []).records, [])
@@ -1,10 +1,11 @@
 # meabot/urls.py
 from django.urls import path
-from .views import telegram_webhook, trigger_check_answers, lean_keep_alive
+from .views import telegram_webhook, trigger_check_answers, lean_keep_alive, sheet_changed
 
 urlpatterns = [
     path('webhook/<path:bot_token>/', telegram_webhook, name='telegram_webhook'),
     path('trigger_check_answers/', trigger_check_answers, name='trigger_check_answers'),
+    path('sheet_changed/', sheet_changed, name='sheet_changed'),
     path('keep_alive/', lean_keep_alive, name='keep_alive'),
 ]
 
@@ -1,26 +1,65 @@
 # meabot/views.py
 import json
 import os
-from django.http import HttpResponse, HttpResponseForbidden
+import hmac
+import hashlib
+import logging
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_GET
+from django.views.decorators.http import require_GET, require_POST
 from telegram import Update
 from asgiref.sync import async_to_sync
-from .bot import application
+from .bot import get_application
+from . import metrics, scheduler
+
+logger = logging.getLogger(__name__)
+
+# Shared with the sheet's change-notification script (see the
+# simulate_sheet_edit command); the endpoint is disabled while unset.
+NOTIFY_SECRET = os.environ.get('MEABOT_NOTIFY_SECRET', '')
+NOTIFY_DEDUP_TTL = 24 * 60 * 60
+
+# secret_token passed to setWebhook; Telegram echoes it on every update
+WEBHOOK_SECRET = os.environ.get('TELEGRAM_WEBHOOK_SECRET', '')
+
+
+def sign_notification(body, secret=None):
+    digest = hmac.new((secret or NOTIFY_SECRET).encode(), body, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+def check_webhook_secret(header_value):
+    """Checks X-Telegram-Bot-Api-Secret-Token when a webhook secret is configured."""
+    if not WEBHOOK_SECRET:
+        return True
+    return hmac.compare_digest(header_value or '', WEBHOOK_SECRET)
+
+
+async def dispatch_update(bot_token, data):
+    """
+    Hands one decoded webhook update to the bot owning `bot_token`. Shared by
+    the Django view and the ASGI fast path (meabot/fastpath.py).
+    """
+    # Unknown tokens are ignored (and still get a 200) so Telegram does not keep retrying
+    bot_app = await get_application(bot_token)
+    if bot_app is None:
+        return
+    # Answer dispatch, cache refresh and metric flushing run in-process. The
+    # ASGI lifespan starts them at boot; this covers servers without lifespan.
+    scheduler.start()
+
+    update = Update.de_json(data, bot_app.bot)
+    await bot_app.process_update(update)
+    metrics.incr('updates')
 
-initialized = False
 
 @csrf_exempt
 async def telegram_webhook(request, bot_token):
-    global initialized
-    if request.method == "POST" and bot_token == application.bot.token:
-        if not initialized:
-            await application.initialize()
-            initialized = True
-
-        data = json.loads(request.body.decode('utf-8'))
-        update = Update.de_json(data, application.bot)
-        await application.process_update(update)
+    if request.method == "POST":
+        if not check_webhook_secret(request.headers.get('X-Telegram-Bot-Api-Secret-Token')):
+            return HttpResponseForbidden("Forbidden")
+        await dispatch_update(bot_token, json.loads(request.body))
 
     return HttpResponse("OK", status=200)
 
@@ -43,3 +82,47 @@ def trigger_check_answers(request):
 @require_GET
 def lean_keep_alive(request):
     return HttpResponse("OK")
+
+
+@csrf_exempt
+@require_POST
+async def sheet_changed(request):
+    """
+    Change notification from the spreadsheet, e.g. an Apps Script onEdit
+    trigger: {"tenant": "default", "rows": [12, 13], "event_id": "..."},
+    signed with X-Meabot-Signature: sha256=<HMAC-SHA256 of the body>.
+    Only the named rows are read and their answers delivered right away.
+    """
+    signature = request.headers.get('X-Meabot-Signature', '')
+    if not NOTIFY_SECRET or not hmac.compare_digest(signature, sign_notification(request.body)):
+        return HttpResponseForbidden("Forbidden")
+
+    try:
+        payload = json.loads(request.body.decode('utf-8'))
+        rows = sorted({int(r) for r in payload.get('rows', [])})
+    except (ValueError, TypeError, AttributeError):
+        return HttpResponseBadRequest("Invalid payload")
+
+    from .tenants import get_source, DEFAULT_TENANT
+    from .questions import deliver_notified_rows
+    from .bot import application_for_source
+
+    source = get_source(payload.get('tenant') or DEFAULT_TENANT)
+    if source is None:
+        return HttpResponseBadRequest("Unknown tenant")
+
+    # Apps Script retries and double-fired triggers carry the same event id;
+    # answers already claimed in the DB are never resent either way.
+    event_id = payload.get('event_id')
+    if event_id and not await cache.aadd(f"sheet_notify:{source.key}:{event_id}", 1, NOTIFY_DEDUP_TTL):
+        return HttpResponse("Duplicate", status=200)
+
+    # Header row and out-of-range rows are ignored
+    rows = [r for r in rows if r >= 2][:500]
+    if not rows:
+        return HttpResponse("OK", status=200)
+
+    sent = await deliver_notified_rows(await application_for_source(source), source, rows)
+    metrics.incr('sheet_notifications')
+    logger.info("Sheet notification for %s rows %s: %d answer(s) sent", source.key, rows, sent)
+    return HttpResponse(f"Sent {sent}", status=200)